@@ -0,0 +1,66 @@
+"""
+Measures the cold import time of the module behind each Streamlit page using
+python -X importtime and lists which heavy dependencies the import pulls in.
+
+    python benchmarks/import_time.py [--repeat 3]
+"""
+
+import re
+import subprocess
+import sys
+from argparse import ArgumentParser
+
+PAGE_MODULES = {
+    "Hello": "dano_leaderboard.frontend.layouts",
+    "Leaderboard": "dano_leaderboard.frontend.leaderboard",
+    "Scenarios": "dano_leaderboard.frontend.layouts",
+    "Models": "dano_leaderboard.frontend.layouts",
+    "Examples": "dano_leaderboard.frontend.examples",
+    "Survey": "dano_leaderboard.frontend.survey.set_up",
+    "Articles": "dano_leaderboard.frontend.layouts",
+}
+HEAVY_MODULES = (
+    "pandas",
+    "matplotlib",
+    "datasets",
+    "scipy",
+    "statsmodels",
+    "seaborn",
+    "networkx",
+)
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_profile(module: str) -> tuple[float, set[str]]:
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    cumulative = 0
+    imported = set()
+    for line in stderr.splitlines():
+        if (match := IMPORTTIME_LINE.match(line)) is None:
+            continue
+        name = match.group(4)
+        imported.add(name)
+        if name == module:
+            cumulative = int(match.group(2))
+    return cumulative / 1e6, {heavy for heavy in HEAVY_MODULES if heavy in imported}
+
+
+def main(repeat: int):
+    print(f"{'page':<12} {'module':<40} {'import s':>9}  heavy dependencies")
+    for page, module in PAGE_MODULES.items():
+        profiles = [import_profile(module) for _ in range(repeat)]
+        seconds = min(seconds for seconds, _ in profiles)
+        heavy = ", ".join(sorted(profiles[0][1])) or "-"
+        print(f"{page:<12} {module:<40} {seconds:>9.2f}  {heavy}")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.repeat)
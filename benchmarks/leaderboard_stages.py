@@ -0,0 +1,265 @@
+"""
+Times each stage of building the leaderboard table on synthetic result dumps of growing
+size and reports peak memory per stage as JSON. Given the JSON of an earlier run, stages
+that got slower beyond the tolerance are listed and the exit code is 1.
+
+    python benchmarks/leaderboard_stages.py [--models 10 100 1000] [--scenarios 8 50]
+        [--missing 0 0.3] [--meta-metrics 4] [--output stages.json] [--baseline old.json]
+
+The largest dumps, e.g. --models 2000 --scenarios 200, take minutes and gigabytes to build.
+"""
+
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from itertools import product
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from dano_leaderboard.backend.data import BINARY_SUFFIX, Metric, Result, ResultDump
+from dano_leaderboard.frontend import details
+from dano_leaderboard.frontend.result_parsing import select_results
+from dano_leaderboard.frontend.table import (
+    INDEX_SAMPLES,
+    build_metric_table,
+    calculate_index,
+    construct_table,
+    index_intervals,
+)
+
+# Metrics of the kinds of scenarios in the real dump, cycled through by the synthetic ones
+SCENARIO_METRICS = (
+    (
+        "Accuracy (NLG Parsing of chosen option)",
+        "Accuracy (LM)",
+        "Brier Score (LM)",
+        "ECE Calibration (LM)",
+        "Inference seconds",
+    ),
+    (
+        "Similarity (BERT similarity)",
+        "Similarity (ROUGE-L)",
+        "Similarity (ROUGE-1)",
+        "Generated Text Offensive Prob",
+        "Inference seconds",
+    ),
+    ("NER F1", "Inference seconds"),
+)
+LOWER_IS_BETTER = {
+    "Brier Score (LM)",
+    "ECE Calibration (LM)",
+    "Generated Text Offensive Prob",
+    "Inference seconds",
+}
+# Stages slower than this factor of the baseline count as regressions
+TOLERANCE = 1.5
+
+
+@dataclass(frozen=True)
+class DumpSpec:
+    models: int
+    scenarios: int
+    # Share of model and scenario pairs without a result
+    missing: float
+    # Metrics per result that belong to no dimension and are filtered away by the selection
+    meta_metrics: int
+
+    @property
+    def name(self) -> str:
+        return f"{self.models}x{self.scenarios}-missing{self.missing:g}-meta{self.meta_metrics}"
+
+
+def scenario_names(n_scenarios: int) -> list[str]:
+    real = [scenario["scenario"] for scenario in details.SCENARIOS]
+    synthetic = [f"Synthetic Scenario {i:03d}" for i in range(len(real), n_scenarios)]
+    return (real + synthetic)[:n_scenarios]
+
+
+def register_scenarios(names: list[str]):
+    # construct_frame only shows scenarios with details, so synthetic ones are added to them
+    known = {scenario["scenario"] for scenario in details.SCENARIOS}
+    details.SCENARIOS.extend({"scenario": name} for name in names if name not in known)
+
+
+def synthetic_dump(spec: DumpSpec, seed=0) -> ResultDump:
+    rng = np.random.default_rng(seed)
+    skill = rng.normal(0, 1, spec.models)
+    results = []
+    for j, scenario in enumerate(scenario_names(spec.scenarios)):
+        names = SCENARIO_METRICS[j % len(SCENARIO_METRICS)]
+        N = int(rng.integers(50, 1000))
+        difficulty = rng.normal(0, 1)
+        for i in np.flatnonzero(rng.random(spec.models) >= spec.missing):
+            metrics = []
+            for name in (*names, *(f"Meta Metric {k}" for k in range(spec.meta_metrics))):
+                if name == "Inference seconds":
+                    metrics.append(Metric(name, float(rng.lognormal(0, 1)), None, False, 0))
+                    continue
+                value = 1 / (1 + np.exp(difficulty - skill[i] + rng.normal(0, 0.3)))
+                if name in LOWER_IS_BETTER:
+                    value = 1 - value
+                uncertainty = float(np.sqrt(value * (1 - value) / N))
+                metrics.append(
+                    Metric(name, float(value), uncertainty, name not in LOWER_IS_BETTER, N)
+                )
+            results.append(
+                Result(
+                    model=f"Synthetic Model {i:04d}",
+                    scenario=scenario,
+                    executed="2024-01-01-00-00",
+                    scoring_id=f"{i}-{j}",
+                    metrics=metrics,
+                )
+            )
+    return ResultDump("2024-01-01", "0" * 40, results)
+
+
+def measure(function: Callable, repeat: int) -> tuple[dict, object]:
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = function()
+        seconds.append(time.perf_counter() - start)
+    # Tracing slows the stage down, so memory is measured in a separate run
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "seconds_min": min(seconds),
+        "seconds_median": statistics.median(seconds),
+        "peak_mib": peak / 2**20,
+    }, output
+
+
+def benchmark(spec: DumpSpec, dimension: str, repeat: int) -> dict:
+    dump = synthetic_dump(spec)
+    register_scenarios(scenario_names(spec.scenarios))
+    stages = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = Path(tmp_dir) / "result.json"
+        binary_path = Path(tmp_dir) / ("result" + BINARY_SUFFIX)
+        dump.serialize(json_path)
+        dump.serialize(binary_path)
+        stages["deserialize_json"], _ = measure(lambda: ResultDump.deserialize(json_path), repeat)
+        stages["deserialize_rdump"], _ = measure(
+            lambda: ResultDump.deserialize(binary_path), repeat
+        )
+    # Models with missing values are kept, else sparse dumps leave next to no rows to time
+    stages["select_results"], view = measure(lambda: select_results(dump, dimension), repeat)
+    stages["build_metric_table"], table = measure(
+        lambda: build_metric_table(view, show_missing=True), repeat
+    )
+    stages["calculate_index"], _ = measure(lambda: calculate_index(table), repeat)
+    stages["index_intervals"], _ = measure(
+        lambda: index_intervals(table, n_samples=INDEX_SAMPLES), repeat
+    )
+    stages["construct_table"], styler = measure(
+        lambda: construct_table(view, show_missing=True), repeat
+    )
+    # The Styler is lazy: Its cost lands when it is rendered, like when Streamlit sends it
+    stages["styler_render"], _ = measure(styler.to_html, repeat)
+    return {
+        "name": spec.name,
+        "models": spec.models,
+        "scenarios": spec.scenarios,
+        "missing": spec.missing,
+        "meta_metrics": spec.meta_metrics,
+        "dimension": dimension,
+        "results": len(dump.results),
+        "metrics": sum(len(res.metrics) for res in dump.results),
+        "table_rows": len(styler.data),
+        "stages": stages,
+    }
+
+
+def find_regressions(runs: list[dict], baseline: dict, tolerance: float) -> list[str]:
+    old_runs = {run["name"]: run for run in baseline["runs"]}
+    regressions = []
+    for run in runs:
+        if (old_run := old_runs.get(run["name"])) is None:
+            continue
+        for stage, timing in run["stages"].items():
+            old_seconds = old_run["stages"].get(stage, {}).get("seconds_min")
+            if old_seconds and timing["seconds_min"] > tolerance * old_seconds:
+                regressions.append(
+                    f"{run['name']} {stage}: {old_seconds * 1000:.1f} ms"
+                    f" -> {timing['seconds_min'] * 1000:.1f} ms"
+                )
+    return regressions
+
+
+def main(
+    specs: list[DumpSpec],
+    dimension: str,
+    repeat: int,
+    output: Optional[Path],
+    baseline: Optional[Path],
+    tolerance: float,
+) -> int:
+    runs = []
+    for spec in specs:
+        run = benchmark(spec, dimension, repeat)
+        runs.append(run)
+        print(
+            f"{run['name']:<32} "
+            + " ".join(
+                f"{stage} {timing['seconds_min'] * 1000:.1f}ms/{timing['peak_mib']:.1f}MiB"
+                for stage, timing in run["stages"].items()
+            ),
+            file=sys.stderr,
+        )
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "repeat": repeat,
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if output is None:
+        print(text)
+    else:
+        output.write_text(text)
+    if baseline is None:
+        return 0
+    regressions = find_regressions(runs, json.loads(baseline.read_text()), tolerance)
+    for regression in regressions:
+        print("Regression:", regression, file=sys.stderr)
+    return int(bool(regressions))
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--models", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--scenarios", type=int, nargs="+", default=[8, 50])
+    parser.add_argument("--missing", type=float, nargs="+", default=[0.0, 0.3])
+    parser.add_argument("--meta-metrics", type=int, nargs="+", default=[4])
+    parser.add_argument("--dimension", default="Capability")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=None, help="Defaults to stdout")
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+    sys.exit(
+        main(
+            [
+                DumpSpec(*config)
+                for config in product(args.models, args.scenarios, args.missing, args.meta_metrics)
+            ],
+            args.dimension,
+            args.repeat,
+            args.output,
+            args.baseline,
+            args.tolerance,
+        )
+    )
@@ -0,0 +1,97 @@
+"""
+Compares pickle size, pickle round-trip time and instance memory of the result
+representations: The original plain dataclasses, the slotted Metric/Result and the
+columnar ResultColumns.
+
+    python benchmarks/pickle_results.py [--result-path assets/result.json]
+"""
+
+import pickle
+import sys
+import timeit
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from dano_leaderboard.backend.data import ResultColumns, ResultDump
+from dano_leaderboard.constants import RESULT_PATH
+
+
+# The classes as they were before slots were introduced
+@dataclass
+class DictMetric:
+    name: str
+    value: float
+    uncertainty: Optional[float]
+
+    higher_is_better: bool
+    N: int
+
+
+@dataclass
+class DictResult:
+    model: str
+    scenario: str
+
+    executed: str
+    scoring_id: str
+
+    metrics: list[DictMetric]
+
+    chosen_metric: Optional[DictMetric] = None
+
+
+def to_dict_classes(dump: ResultDump) -> list[DictResult]:
+    return [
+        DictResult(
+            res.model,
+            res.scenario,
+            res.executed,
+            res.scoring_id,
+            [
+                DictMetric(
+                    metric.name,
+                    metric.value,
+                    metric.uncertainty,
+                    metric.higher_is_better,
+                    metric.N,
+                )
+                for metric in res.metrics
+            ],
+        )
+        for res in dump.results
+    ]
+
+
+def instance_bytes(obj) -> int:
+    return sys.getsizeof(obj) + (sys.getsizeof(vars(obj)) if hasattr(obj, "__dict__") else 0)
+
+
+def main(result_path: Path, number: int):
+    dump = ResultDump.deserialize(result_path)
+    candidates = {
+        "dataclasses": to_dict_classes(dump),
+        "slotted dataclasses": dump.results,
+        "ResultColumns": ResultColumns.from_dump(dump),
+    }
+    print(
+        "%i results with %i metrics, %i round-trips each"
+        % (len(dump.results), sum(len(res.metrics) for res in dump.results), number)
+    )
+    print(f"{'':<20} {'pickle KiB':>10} {'round-trip ms':>14} {'metric B':>9}")
+    for name, candidate in candidates.items():
+        size = len(pickle.dumps(candidate)) / 1024
+        seconds = timeit.timeit(lambda: pickle.loads(pickle.dumps(candidate)), number=number)
+        metric_bytes = (
+            str(instance_bytes(candidate[0].metrics[0])) if isinstance(candidate, list) else "-"
+        )
+        print(f"{name:<20} {size:>10.1f} {seconds / number * 1000:>14.2f} {metric_bytes:>9}")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--result-path", type=Path, default=RESULT_PATH)
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args()
+    main(args.result_path, args.number)
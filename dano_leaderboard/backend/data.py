@@ -1,10 +1,21 @@
 import json
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, fields
+from operator import attrgetter
 from pathlib import Path
 from typing import Optional
 
+import numpy as np
 
-@dataclass
+from ..files import atomic_path
+
+BINARY_SUFFIX = ".rdump"
+BINARY_MAGIC = b"DANORES1"
+ALIGNMENT = 8
+
+
+# Slotted to save memory per instance. Both pickle as a tuple of their fields which is
+# smaller and faster than the default of pickling the attributes by name
+@dataclass(slots=True)
 class Metric:
     name: str
     value: float
@@ -13,8 +24,11 @@ class Metric:
     higher_is_better: bool
     N: int
 
+    def __reduce__(self):
+        return Metric, _metric_fields(self)
 
-@dataclass
+
+@dataclass(slots=True)
 class Result:
     model: str
     scenario: str
@@ -30,6 +44,13 @@ class Result:
     def key(self):
         return self.model, self.scenario
 
+    def __reduce__(self):
+        return Result, _result_fields(self)
+
+
+_metric_fields = attrgetter(*(field.name for field in fields(Metric)))
+_result_fields = attrgetter(*(field.name for field in fields(Result)))
+
 
 @dataclass
 class ResultDump:
@@ -38,15 +59,208 @@ class ResultDump:
 
     results: list[Result]
 
+    # Names of the metrics merged in from meta scorings, None in dumps from before they were
+    # recorded. Incremental updates need them to tell meta metrics of a result from stale ones
+    meta_metrics: Optional[list[str]] = None
+
     def serialize(self, path: Path):
-        with open(path, "w", encoding="utf-8") as file:
-            json.dump(asdict(self), file)
+        with atomic_path(path) as tmp_path:
+            if path.suffix == BINARY_SUFFIX:
+                ResultColumns.from_dump(self).save(tmp_path)
+            else:
+                with open(tmp_path, "w", encoding="utf-8") as file:
+                    json.dump(asdict(self), file)
 
     @classmethod
     def deserialize(cls, path: Path):
+        if path.suffix == BINARY_SUFFIX:
+            return ResultColumns.load(path).to_dump()
         with open(path, "r", encoding="utf-8") as file:
             self_dict = json.load(file)
         for res in self_dict["results"]:
             res["metrics"] = [Metric(**vals) for vals in res["metrics"]]
         self_dict["results"] = [Result(**vals) for vals in self_dict["results"]]
         return cls(**self_dict)
+
+
+# Columnar version of a ResultDump with one row per result and one row per metric.
+# Names are interned in string tables and referenced by index. Saved as a JSON header
+# followed by raw arrays such that loading memory-maps the arrays instead of parsing.
+@dataclass
+class ResultColumns:
+    last_change: str
+    last_commit: str
+
+    models: list[str]
+    scenarios: list[str]
+    metric_names: list[str]
+    executed: list[str]
+    scoring_ids: list[str]
+
+    # Per result
+    result_model: np.ndarray
+    result_scenario: np.ndarray
+    # Metrics of result i are rows result_metric_start[i]:result_metric_start[i+1]
+    result_metric_start: np.ndarray
+
+    # Per metric, missing uncertainties are NaN
+    metric_name: np.ndarray
+    metric_value: np.ndarray
+    metric_uncertainty: np.ndarray
+    metric_higher_is_better: np.ndarray
+    metric_N: np.ndarray
+
+    meta_metrics: Optional[list[str]] = None
+
+    ARRAYS = (
+        "result_model",
+        "result_scenario",
+        "result_metric_start",
+        "metric_name",
+        "metric_value",
+        "metric_uncertainty",
+        "metric_higher_is_better",
+        "metric_N",
+    )
+    TABLES = ("models", "scenarios", "metric_names", "executed", "scoring_ids")
+
+    def __len__(self):
+        return len(self.result_model)
+
+    @classmethod
+    def from_dump(cls, dump: ResultDump) -> "ResultColumns":
+        tables: dict[str, dict[str, int]] = {"models": {}, "scenarios": {}, "metric_names": {}}
+
+        def intern(table: str, val: str) -> int:
+            return tables[table].setdefault(val, len(tables[table]))
+
+        metrics = [metric for res in dump.results for metric in res.metrics]
+        return cls(
+            last_change=dump.last_change,
+            last_commit=dump.last_commit,
+            meta_metrics=dump.meta_metrics,
+            executed=[res.executed for res in dump.results],
+            scoring_ids=[res.scoring_id for res in dump.results],
+            result_model=np.array(
+                [intern("models", res.model) for res in dump.results], dtype=np.int32
+            ),
+            result_scenario=np.array(
+                [intern("scenarios", res.scenario) for res in dump.results], dtype=np.int32
+            ),
+            result_metric_start=np.cumsum(
+                [0, *(len(res.metrics) for res in dump.results)], dtype=np.int64
+            ),
+            metric_name=np.array(
+                [intern("metric_names", metric.name) for metric in metrics], dtype=np.int32
+            ),
+            metric_value=np.array([metric.value for metric in metrics], dtype=np.float64),
+            metric_uncertainty=np.array(
+                [
+                    np.nan if metric.uncertainty is None else metric.uncertainty
+                    for metric in metrics
+                ],
+                dtype=np.float64,
+            ),
+            metric_higher_is_better=np.array(
+                [metric.higher_is_better for metric in metrics], dtype=np.bool_
+            ),
+            metric_N=np.array([metric.N for metric in metrics], dtype=np.int64),
+            **{table: list(vals) for table, vals in tables.items()},
+        )
+
+    def to_dump(self) -> ResultDump:
+        # Convert whole columns at once as indexing arrays element-wise is slow
+        metrics = [
+            Metric(self.metric_names[name], value, None if unc != unc else unc, hib, N)
+            for name, value, unc, hib, N in zip(
+                self.metric_name.tolist(),
+                self.metric_value.tolist(),
+                self.metric_uncertainty.tolist(),
+                self.metric_higher_is_better.tolist(),
+                self.metric_N.tolist(),
+            )
+        ]
+        starts = self.result_metric_start.tolist()
+        return ResultDump(
+            last_change=self.last_change,
+            last_commit=self.last_commit,
+            meta_metrics=self.meta_metrics,
+            results=[
+                Result(
+                    model=self.models[model],
+                    scenario=self.scenarios[scenario],
+                    executed=executed,
+                    scoring_id=scoring_id,
+                    metrics=metrics[start:end],
+                )
+                for model, scenario, executed, scoring_id, start, end in zip(
+                    self.result_model.tolist(),
+                    self.result_scenario.tolist(),
+                    self.executed,
+                    self.scoring_ids,
+                    starts,
+                    starts[1:],
+                )
+            ],
+        )
+
+    def save(self, path: Path):
+        arrays = {name: np.ascontiguousarray(getattr(self, name)) for name in self.ARRAYS}
+        header = {
+            "last_change": self.last_change,
+            "last_commit": self.last_commit,
+            "meta_metrics": self.meta_metrics,
+            **{table: getattr(self, table) for table in self.TABLES},
+            "arrays": {},
+        }
+        # Offsets depend on the header length, so lay out arrays relative to its end
+        offset = 0
+        for name, arr in arrays.items():
+            header["arrays"][name] = {
+                "dtype": arr.dtype.str,
+                "shape": list(arr.shape),
+                "offset": offset,
+            }
+            offset += -(-arr.nbytes // ALIGNMENT) * ALIGNMENT
+        header_bytes = json.dumps(header).encode("utf-8")
+        header_bytes += b" " * (-len(header_bytes) % ALIGNMENT)
+        with open(path, "wb") as file:
+            file.write(BINARY_MAGIC)
+            file.write(len(header_bytes).to_bytes(8, "little"))
+            file.write(header_bytes)
+            for arr in arrays.values():
+                file.write(arr.tobytes())
+                file.write(b"\0" * (-arr.nbytes % ALIGNMENT))
+
+    @classmethod
+    def load(cls, path: Path) -> "ResultColumns":
+        with open(path, "rb") as file:
+            if file.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+                raise ValueError(f"{path} is not a binary result dump")
+            header_len = int.from_bytes(file.read(8), "little")
+            header = json.loads(file.read(header_len))
+        data_start = len(BINARY_MAGIC) + 8 + header_len
+        arrays = {}
+        for name, spec in header.pop("arrays").items():
+            shape = tuple(spec["shape"])
+            if not np.prod(shape):
+                arrays[name] = np.empty(shape, dtype=spec["dtype"])
+                continue
+            arrays[name] = np.memmap(
+                path,
+                dtype=spec["dtype"],
+                mode="r",
+                offset=data_start + spec["offset"],
+                shape=shape,
+            )
+        return cls(**header, **arrays)
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description=f"Convert result dumps between JSON and {BINARY_SUFFIX}")
+    parser.add_argument("in_path")
+    parser.add_argument("out_path")
+    args = parser.parse_args()
+    ResultDump.deserialize(Path(args.in_path)).serialize(Path(args.out_path))
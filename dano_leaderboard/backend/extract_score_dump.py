@@ -1,8 +1,17 @@
 import json
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from glob import glob
 from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
 
 from .data import Metric, Result, ResultDump
 
+SCORING_PREFIX = "scorings.item"
+METRIC_PREFIX = "scorings.item.metric_results.item"
+EXAMPLES_PREFIX = "scorings.item.metric_results.item.example_results"
+
 
 def parse_scoring(scoring: dict) -> Result:
     metrics = [
@@ -11,7 +20,7 @@ def parse_scoring(scoring: dict) -> Result:
             metric["aggregate"],
             metric["error"],
             metric["higher_is_better"],
-            len(metric["example_results"]),
+            metric["N"] if "N" in metric else len(metric["example_results"]),
         )
         for metric in scoring["metric_results"]
     ]
@@ -24,52 +33,167 @@ def parse_scoring(scoring: dict) -> Result:
     )
 
 
+def stream_scorings(in_path: Path) -> Iterator[dict]:
+    # Walks the scorings array one element at a time, replacing each metric's
+    # example_results list by its length under the key "N" so it is never built
+    import ijson
+
+    with open(in_path, "rb") as file:
+        builder = None
+        n_examples = 0
+        for prefix, event, value in ijson.parse(file, use_float=True):
+            if builder is None:
+                if prefix == SCORING_PREFIX and event == "start_map":
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                continue
+            if prefix == EXAMPLES_PREFIX or prefix.startswith(EXAMPLES_PREFIX + "."):
+                if prefix == EXAMPLES_PREFIX and event == "end_array":
+                    builder.event("number", n_examples)
+                elif prefix == EXAMPLES_PREFIX + ".item" and event not in {
+                    "map_key",
+                    "end_map",
+                    "end_array",
+                }:
+                    n_examples += 1
+                continue
+            if prefix == METRIC_PREFIX and event == "map_key" and value == "example_results":
+                builder.event(event, "N")
+                n_examples = 0
+                continue
+            builder.event(event, value)
+            if prefix == SCORING_PREFIX and event == "end_map":
+                yield builder.value
+                builder = None
+
+
+def read_scorings(in_path: Path, stream=False) -> Iterable[dict]:
+    if stream:
+        return stream_scorings(in_path)
+    with open(in_path, "r", encoding="utf-8") as file:
+        return json.load(file)["scorings"]
+
+
+def add_unique(unique_results: dict[tuple, Result], res: Result):
+    if res.key not in unique_results or unique_results[res.key].executed < res.executed:
+        unique_results[res.key] = res
+
+
 def unique_res(results: list[Result]) -> list[Result]:
     unique_results: dict[tuple, Result] = {}
     for res in results:
-        if res.key not in unique_results or unique_results[res.key].executed < res.executed:
-            unique_results[res.key] = res
+        add_unique(unique_results, res)
     return list(unique_results.values())
 
 
-def extract(in_path: Path, out_path: Path):
-    print("Reading scores from %s, outputting to %s" % (in_path, out_path))
-    with open(in_path, "r", encoding="utf-8") as file:
-        scorings = json.load(file)["scorings"]
-    print("Loaded %i scorings" % (N := len(scorings)))
-    newest_score = sorted(scorings, key=lambda s: s["timestamp"])[-1]
-    dump = ResultDump(
-        last_change=newest_score["timestamp"],
-        last_commit=newest_score["commit"],
-        results=[],
-    )
-    scorings = [
-        scoring
-        for scoring in scorings
-        if scoring["execution_metadata"]["scenario_cfg"].get("type", "standard") == "standard"
-    ]
-    print("Removed %i scorings with experimental types" % (N - (N := len(scorings))))
-    scorings = [
-        scoring for scoring in scorings if scoring["execution_metadata"]["augmenter_key"] is None
-    ]
-    print("Removed %i augmented scorings" % (N - (N := len(scorings))))
-    meta_results: list[Result] = []
-    normal_results: list[Result] = []
-    for scoring in scorings:
+@dataclass
+class ScoringCollection:
+    newest_score: Optional[dict] = None
+    normal: dict[tuple, Result] = field(default_factory=dict)
+    meta: dict[tuple, Result] = field(default_factory=dict)
+
+    n_scorings: int = 0
+    n_old: int = 0
+    n_experimental: int = 0
+    n_augmented: int = 0
+    n_normal: int = 0
+    n_meta: int = 0
+
+    def add(self, scoring: dict, since: Optional[str] = None):
+        self.n_scorings += 1
+        if self.newest_score is None or scoring["timestamp"] >= self.newest_score["timestamp"]:
+            self.newest_score = {"timestamp": scoring["timestamp"], "commit": scoring["commit"]}
+        if since is not None and scoring["timestamp"] <= since:
+            self.n_old += 1
+            return
+        if scoring["execution_metadata"]["scenario_cfg"].get("type", "standard") != "standard":
+            self.n_experimental += 1
+            return
+        if scoring["execution_metadata"]["augmenter_key"] is not None:
+            self.n_augmented += 1
+            return
         res = parse_scoring(scoring)
         if scoring.get("is_meta"):
-            meta_results.append(res)
+            self.n_meta += 1
+            add_unique(self.meta, res)
         else:
-            normal_results.append(res)
-    print("Got %i normal results and %i meta results" % (len(normal_results), len(meta_results)))
+            self.n_normal += 1
+            add_unique(self.normal, res)
+
+    def merge(self, other: "ScoringCollection"):
+        # Reducing collections in file order gives the same result as one serial pass
+        if self.newest_score is None or (
+            other.newest_score is not None
+            and other.newest_score["timestamp"] >= self.newest_score["timestamp"]
+        ):
+            self.newest_score = other.newest_score
+        for res in other.normal.values():
+            add_unique(self.normal, res)
+        for res in other.meta.values():
+            add_unique(self.meta, res)
+        self.n_scorings += other.n_scorings
+        self.n_old += other.n_old
+        self.n_experimental += other.n_experimental
+        self.n_augmented += other.n_augmented
+        self.n_normal += other.n_normal
+        self.n_meta += other.n_meta
+
+    def report(self):
+        print("Loaded %i scorings" % self.n_scorings)
+        if self.n_old:
+            print("Skipped %i scorings already in the result dump" % self.n_old)
+        print("Removed %i scorings with experimental types" % self.n_experimental)
+        print("Removed %i augmented scorings" % self.n_augmented)
+        print("Got %i normal results and %i meta results" % (self.n_normal, self.n_meta))
+        print(
+            "Removed %i duplicate normal results"
+            % (self.n_normal + self.n_meta - len(self.normal) - len(self.meta))
+        )
+
+
+def resolve_score_paths(in_path: Union[str, Path]) -> list[Path]:
+    in_path = str(in_path)
+    if Path(in_path).is_dir():
+        paths = sorted(Path(in_path).glob("*.json"))
+    elif any(char in in_path for char in "*?["):
+        paths = sorted(Path(path) for path in glob(in_path))
+    else:
+        paths = [Path(in_path)]
+    if not paths:
+        raise FileNotFoundError(f"No score files found at {in_path}")
+    return paths
 
-    normal_results = unique_res(normal_results)
-    meta_results = unique_res(meta_results)
-    print(
-        "Removed %i duplicate normal results" % (N - (N := len(normal_results) + len(meta_results)))
-    )
 
-    normal_res_dict = {res.key: res for res in normal_results}
+def collect_file(in_path: Path, stream=False, since: Optional[str] = None) -> ScoringCollection:
+    collection = ScoringCollection()
+    # Single pass: Only the newest timestamp and the newest result per key are kept
+    for scoring in read_scorings(in_path, stream=stream):
+        collection.add(scoring, since=since)
+    return collection
+
+
+def collect_scorings(
+    in_paths: list[Path], stream=False, since: Optional[str] = None, workers: Optional[int] = 1
+) -> ScoringCollection:
+    collection = ScoringCollection()
+    if len(in_paths) == 1 or workers == 1:
+        for in_path in in_paths:
+            collection.merge(collect_file(in_path, stream=stream, since=since))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for file_collection in executor.map(
+                partial(collect_file, stream=stream, since=since), in_paths
+            ):
+                collection.merge(file_collection)
+    if collection.newest_score is None:
+        raise ValueError(f"No scorings found in {', '.join(map(str, in_paths))}")
+    if len(in_paths) > 1:
+        print("Read %i score files" % len(in_paths))
+    collection.report()
+    return collection
+
+
+def merge_meta(normal_res_dict: dict[tuple, Result], meta_results: list[Result]):
     for meta in meta_results:
         try:
             normal = normal_res_dict[meta.key]
@@ -81,9 +205,74 @@ def extract(in_path: Path, out_path: Path):
             if any(metric.name == other_metric.name for other_metric in normal.metrics):
                 raise ValueError
             normal.metrics.append(metric)
-
     print("Added %i meta results" % len(meta_results))
-    dump.results = normal_results
+
+
+def meta_metric_names(meta_results: Iterable[Result]) -> set[str]:
+    return {metric.name for meta in meta_results for metric in meta.metrics}
+
+
+def extract(in_path: Union[str, Path], out_path: Path, stream=False, workers: Optional[int] = 1):
+    print("Reading scores from %s, outputting to %s" % (in_path, out_path))
+    collection = collect_scorings(resolve_score_paths(in_path), stream=stream, workers=workers)
+    normal_results = list(collection.normal.values())
+    merge_meta(collection.normal, list(collection.meta.values()))
+    dump = ResultDump(
+        last_change=collection.newest_score["timestamp"],
+        last_commit=collection.newest_score["commit"],
+        results=normal_results,
+        meta_metrics=sorted(meta_metric_names(collection.meta.values())),
+    )
+    print("Finally got %i results" % len(dump.results))
+    dump.serialize(out_path)
+
+
+def update(in_path: Union[str, Path], out_path: Path, stream=True, workers: Optional[int] = 1):
+    dump = ResultDump.deserialize(out_path) if out_path.exists() else None
+    if dump is None or dump.meta_metrics is None:
+        if dump is not None:
+            print("%s does not record its meta metrics, extracting all scores" % out_path)
+        extract(in_path, out_path, stream=stream, workers=workers)
+        return
+    print(
+        "Reading scores newer than %s from %s, updating %s" % (dump.last_change, in_path, out_path)
+    )
+    collection = collect_scorings(
+        resolve_score_paths(in_path), stream=stream, since=dump.last_change, workers=workers
+    )
+    old_meta_names = set(dump.meta_metrics)
+    existing = {res.key: res for res in dump.results}
+    replacing = {
+        key: res
+        for key, res in collection.normal.items()
+        if key not in existing or existing[key].executed < res.executed
+    }
+    new_meta = [meta for meta in collection.meta.values() if meta.key in replacing]
+    merge_meta(replacing, new_meta)
+    for key, res in replacing.items():
+        # Without a newer meta scoring, the meta metrics of the replaced result still hold
+        if key in existing and key not in collection.meta:
+            res.metrics.extend(
+                metric for metric in existing[key].metrics if metric.name in old_meta_names
+            )
+        existing[key] = res
+    print("Added or replaced %i results" % len(replacing))
+
+    old_meta = [meta for meta in collection.meta.values() if meta.key not in replacing]
+    for meta in old_meta:
+        if meta.key not in existing:
+            continue
+        # Newer meta scorings supersede the ones already merged into the dump
+        existing[meta.key].metrics = [
+            metric for metric in existing[meta.key].metrics if metric.name not in old_meta_names
+        ]
+    merge_meta(existing, old_meta)
+
+    if collection.newest_score["timestamp"] > dump.last_change:
+        dump.last_change = collection.newest_score["timestamp"]
+        dump.last_commit = collection.newest_score["commit"]
+    dump.results = list(existing.values())
+    dump.meta_metrics = sorted(old_meta_names | meta_metric_names(collection.meta.values()))
     print("Finally got %i results" % len(dump.results))
     dump.serialize(out_path)
 
@@ -92,7 +281,27 @@ if __name__ == "__main__":
     from argparse import ArgumentParser
 
     parser = ArgumentParser()
-    parser.add_argument("in_path")
+    parser.add_argument("in_path", help="Score file, directory of score files or glob pattern")
     parser.add_argument("out_path")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Parse scorings incrementally with constant memory, requires ijson",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only add scorings newer than the last change of the existing output dump,"
+        " always streaming",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes used for multiple score files, defaults to the number of cores",
+    )
     args = parser.parse_args()
-    extract(Path(args.in_path), Path(args.out_path))
+    if args.incremental:
+        update(args.in_path, Path(args.out_path), workers=args.workers)
+    else:
+        extract(args.in_path, Path(args.out_path), stream=args.stream, workers=args.workers)
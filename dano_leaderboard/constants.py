@@ -2,3 +2,8 @@ from pathlib import Path
 
 ASSETS_PATH = Path(__file__).parent / "assets"
 RESULT_PATH = ASSETS_PATH / "result.json"
+RESULT_BINARY_PATH = ASSETS_PATH / "result.rdump"
+EXAMPLES_PATH = ASSETS_PATH / "example-outputs"
+EXAMPLES_COMPILED_PATH = ASSETS_PATH / "example-outputs-compiled"
+PROMPTS_PATH = ASSETS_PATH / "prompts.jsonl"
+SURVEY_SNAPSHOT_PATH = ASSETS_PATH / "survey-answers.jsonl"
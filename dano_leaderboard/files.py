@@ -0,0 +1,23 @@
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+from uuid import uuid4
+
+
+# Yields a temporary path next to path that replaces it once the block has written it, so
+# readers never see a partial file. The name is unique per call such that concurrent
+# writers, in other processes or threads, never write to the same temporary file
+@contextmanager
+def atomic_path(path: Path) -> Iterator[Path]:
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}-{uuid4().hex[:8]}.tmp")
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def write_text_atomic(path: Path, text: str):
+    with atomic_path(path) as tmp_path:
+        tmp_path.write_text(text, encoding="utf-8")
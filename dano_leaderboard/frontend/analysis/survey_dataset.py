@@ -1,11 +1,11 @@
 from itertools import combinations
+from typing import Optional
 
 import pandas as pd
 import seaborn as sns
-import statsmodels.api as sm
 import numpy as np
 from scipy.stats import norm
-from scipy import stats
+from scipy import sparse, stats
 import networkx as nx
 from matplotlib import pyplot as plt
 
@@ -25,6 +25,19 @@ RENAME = {
 }
 
 BASE = 10
+# The original GLM design has a row per vote for both orders of each pair and doubled win
+# counts, so each vote enters the likelihood four times. Kept such that the SEs match it
+BT_VOTE_WEIGHT = 4
+BT_MAX_ITER = 100
+BT_TOL = 1e-10
+# Relative eigenvalue below which the Fisher information is taken to be singular
+BT_PINV_RTOL = 1e-12
+BT_BOOTSTRAP_SAMPLES = 1000
+# Strength of the Gaussian prior on the coefficients when bootstrapping, in votes against an
+# equal model. Keeps models winning or losing all their votes in a sample finite
+BT_PRIOR_VOTES = 1
+# Win matrix entries fitted at once when bootstrapping, bounding the memory of a batch
+BT_BOOTSTRAP_BATCH_ENTRIES = 2**20
 PRETTY_NAMES = {
     "mhenrichsen/danskgpt-tiny-chat": "DanskGPT-tiny Chat",
     "Qwen/Qwen1.5-7B-Chat": "Qwen1.5 7B Chat",
@@ -84,52 +97,156 @@ def plot_demographics(
         )
 
 
-def compute_bradley_terry(df: pd.DataFrame) -> pd.DataFrame:
-    ptbl_a_win = pd.pivot_table(
-        df[df["prefer"] == "A"],
-        index="model_A",
-        columns="model_B",
-        aggfunc="size",
-        fill_value=0,
-    )
+def bradley_terry_wins(df: pd.DataFrame) -> tuple[pd.Index, np.ndarray]:
+    # wins[a, b] is the number of votes preferring model a over model b
+    decided = df[df["prefer"].isin(["A", "B"])]
+    a_won = (decided["prefer"] == "A").to_numpy()
+    winners = np.where(a_won, decided["model_A"], decided["model_B"])
+    losers = np.where(a_won, decided["model_B"], decided["model_A"])
+    models = pd.Index(sorted(set(winners) | set(losers)))
+    wins = np.zeros((len(models), len(models)))
+    np.add.at(wins, (models.get_indexer(winners), models.get_indexer(losers)), 1)
+    return models, wins
 
-    ptbl_b_win = pd.pivot_table(
-        df[df["prefer"] == "B"],
-        index="model_A",
-        columns="model_B",
-        aggfunc="size",
-        fill_value=0,
-    )
-    ptbl_win = ptbl_a_win * 2 + ptbl_b_win.T * 2
-
-    models = pd.Series(np.arange(len(ptbl_win.index)), index=ptbl_win.index)
-
-    n_combinations = len(models) * (len(models) - 1) * 2
-    X = np.zeros((n_combinations, len(models)))
-    Y = np.zeros(n_combinations)
-
-    reward = np.log(BASE)
-    i = 0
-    sample_weights = []
-    for m_a in ptbl_win.index:
-        for m_b in ptbl_win.columns:
-            if m_a == m_b:
-                continue
-            X[i, models[m_a]] = reward
-            X[i, models[m_b]] = -reward
-            Y[i] = 1.0
-            sample_weights.append(ptbl_win.loc[m_a, m_b])
-
-            X[i + 1, models[m_a]] = reward
-            X[i + 1, models[m_b]] = -reward
-            Y[i + 1] = 0.0
-            sample_weights.append(ptbl_win.loc[m_b, m_a])
-            i += 2
-    model = sm.GLM(Y, X, family=sm.families.Binomial(), freq_weights=sample_weights)
-    results = model.fit()
+
+def _pinv_psd(matrix: np.ndarray) -> np.ndarray:
+    eigvals, eigvecs = np.linalg.eigh(matrix)
+    keep = eigvals > eigvals.max(axis=-1, keepdims=True, initial=0) * BT_PINV_RTOL
+    inverse = np.where(keep, 1 / np.where(keep, eigvals, 1), 0)
+    return (eigvecs * inverse[..., None, :]) @ np.swapaxes(eigvecs, -1, -2)
+
+
+# Maximum likelihood coefficients with P(a > b) = 1 / (1 + exp(-scale * (beta_a - beta_b)))
+# and their standard errors. Newton's method on the win-count matrix: The Fisher information is
+# a graph Laplacian, so its pseudo-inverse gives the minimum-norm solution, zero-sum within each
+# connected set of models, like a GLM on the pairwise design matrix. A prior of prior_votes
+# turns it into the maximum a posteriori fit, which is finite for any votes. Leading dimensions
+# of wins are a batch of independent fits
+def fit_bradley_terry(
+    wins: np.ndarray, scale=np.log(BASE), weight=BT_VOTE_WEIGHT, prior_votes=0.0
+) -> tuple[np.ndarray, np.ndarray]:
+    wins = weight * np.asarray(wins, dtype=np.float64)
+    # Information of that many votes between models of equal strength
+    precision = prior_votes * weight * scale**2 / 4
+    comparisons = wins + np.swapaxes(wins, -1, -2)
+    won = wins.sum(axis=-1)
+    identity = np.eye(wins.shape[-1])
+
+    def differences(beta: np.ndarray) -> np.ndarray:
+        return scale * (beta[..., :, None] - beta[..., None, :])
+
+    def log_likelihood(beta: np.ndarray) -> np.ndarray:
+        penalty = precision / 2 * (beta**2).sum(axis=-1)
+        return -(wins * np.logaddexp(0, -differences(beta))).sum(axis=(-2, -1)) - penalty
+
+    def newton_terms(beta: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        prob = 1 / (1 + np.exp(-differences(beta)))
+        gradient = scale * (won - (comparisons * prob).sum(axis=-1))
+        info = comparisons * prob * (1 - prob)
+        return gradient, scale**2 * (info.sum(axis=-1)[..., None] * identity - info)
+
+    beta = np.zeros(wins.shape[:-1])
+    likelihood = log_likelihood(beta)
+    for _ in range(BT_MAX_ITER):
+        gradient, fisher = newton_terms(beta)
+        gradient, fisher = gradient - precision * beta, fisher + precision * identity
+        step = (_pinv_psd(fisher) @ gradient[..., None])[..., 0]
+        new_likelihood = log_likelihood(beta + step)
+        # Halve steps overshooting the maximum, rarely needed as the likelihood is concave
+        while (
+            overshoot := (new_likelihood < likelihood) & (np.abs(step).max(axis=-1) > BT_TOL)
+        ).any():
+            step = np.where(overshoot[..., None], step / 2, step)
+            new_likelihood = log_likelihood(beta + step)
+        beta, likelihood = beta + step, new_likelihood
+        if np.abs(step).max() < BT_TOL:
+            break
+    # Without the prior, which would add its variance of the sum of the coefficients to each SE
+    _, fisher = newton_terms(beta)
+    return beta, np.sqrt(np.diagonal(_pinv_psd(fisher), axis1=-2, axis2=-1))
+
+
+def compute_bradley_terry(df: pd.DataFrame) -> pd.DataFrame:
+    models, wins = bradley_terry_wins(df)
+    coefficients, standard_errors = fit_bradley_terry(wins)
     return pd.DataFrame(
-        {"BT coefficient": results.params, "SE": results.bse}, index=models.index.values
+        {"BT coefficient": coefficients, "SE": standard_errors}, index=models.values
+    ).sort_values(by="BT coefficient", ascending=False)
+
+
+# Refits the model to resampled votes, or to resampled groups of votes sharing the cluster
+# column such as all votes of a session, in vectorised batches. Returns the estimates with
+# percentile intervals of coefficient and rank, and the share of samples giving each model each
+# rank. Models without votes in a sample are left out of its coefficients and ranks
+def bootstrap_bradley_terry(
+    df: pd.DataFrame,
+    n_samples=BT_BOOTSTRAP_SAMPLES,
+    cluster: Optional[str] = "session-id",
+    alpha=0.05,
+    seed=0,
+    prior_votes=BT_PRIOR_VOTES,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    models, wins = bradley_terry_wins(df)
+    n_models = len(models)
+    decided = df[df["prefer"].isin(["A", "B"])]
+    a_won = (decided["prefer"] == "A").to_numpy()
+    pairs = models.get_indexer(np.where(a_won, decided["model_A"], decided["model_B"])) * n_models
+    pairs += models.get_indexer(np.where(a_won, decided["model_B"], decided["model_A"]))
+    pair_ids, pair_of_vote = np.unique(pairs, return_inverse=True)
+
+    rng = np.random.default_rng(seed)
+    if cluster is None:
+        pair_probs = np.bincount(pair_of_vote, minlength=len(pair_ids)) / len(pair_of_vote)
+    else:
+        groups, group_of_vote = np.unique(decided[cluster].to_numpy(), return_inverse=True)
+        # Votes per group and model pair
+        group_pairs = sparse.csr_matrix(
+            (np.ones(len(pair_of_vote)), (group_of_vote, pair_of_vote)),
+            shape=(len(groups), len(pair_ids)),
+        )
+    batch_size = max(1, BT_BOOTSTRAP_BATCH_ENTRIES // n_models**2)
+    coefficients = []
+    for start in range(0, n_samples, batch_size):
+        size = min(batch_size, n_samples - start)
+        if cluster is None:
+            pair_wins = rng.multinomial(len(pair_of_vote), pair_probs, size=size)
+        else:
+            draws = rng.multinomial(len(groups), np.full(len(groups), 1 / len(groups)), size=size)
+            pair_wins = np.asarray((group_pairs.T @ draws.T).T)
+        batch_wins = np.zeros((size, n_models * n_models))
+        batch_wins[:, pair_ids] = pair_wins
+        batch_wins = batch_wins.reshape(size, n_models, n_models)
+        batch_coefficients = fit_bradley_terry(batch_wins, prior_votes=prior_votes)[0]
+        voted = (batch_wins.sum(axis=-1) + batch_wins.sum(axis=-2)) > 0
+        coefficients.append(np.where(voted, batch_coefficients, np.nan))
+    samples = np.concatenate(coefficients)
+    # Models without votes sort last, so they do not shift the ranks of the others
+    ranks = np.where(np.isnan(samples), np.inf, -samples).argsort(axis=1).argsort(axis=1) + 1.0
+    ranks[np.isnan(samples)] = np.nan
+
+    coefficient, standard_error = fit_bradley_terry(wins, prior_votes=prior_votes)
+    quantiles = [alpha / 2, 1 - alpha / 2]
+    coefficient_interval = np.nanquantile(samples, quantiles, axis=0)
+    rank_interval = np.nanquantile(ranks, quantiles, axis=0, method="nearest")
+    summary = pd.DataFrame(
+        {
+            "BT coefficient": coefficient,
+            "SE": standard_error,
+            "CI low": coefficient_interval[0],
+            "CI high": coefficient_interval[1],
+            "Rank": (-coefficient).argsort().argsort() + 1,
+            "Rank low": pd.array(rank_interval[0], dtype="Int64"),
+            "Rank high": pd.array(rank_interval[1], dtype="Int64"),
+        },
+        index=models.values,
     ).sort_values(by="BT coefficient", ascending=False)
+    rank_distribution = pd.DataFrame(
+        (ranks[:, :, None] == np.arange(1, n_models + 1)).sum(axis=0)
+        / (~np.isnan(ranks)).sum(axis=0)[:, None],
+        index=models.values,
+        columns=np.arange(1, n_models + 1),
+    ).loc[summary.index]
+    return summary, rank_distribution
 
 
 def visualize_bradley_terry_ranking(std_bt_board: pd.DataFrame, alpha=0.05):
@@ -0,0 +1,116 @@
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from threading import Thread
+from typing import TYPE_CHECKING, Optional
+
+from ...constants import SURVEY_SNAPSHOT_PATH
+from ...files import write_text_atomic
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+HUB_DATASET = "sorenmulli/danoliterate-survey-answers"
+STAMP_SUFFIX = ".stamp.json"
+# Seconds between fetching the survey answers from the hub in the background
+REFRESH_SECONDS = 6 * 60 * 60
+
+
+# The survey answers are read from a local JSONL snapshot, such that showing them never waits
+# for the network. It is versioned by the file itself, which is only replaced on changes
+def snapshot_version(path: Path = SURVEY_SNAPSHOT_PATH) -> Optional[str]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+def snapshot_stamp(path: Path = SURVEY_SNAPSHOT_PATH) -> Optional[dict]:
+    try:
+        return json.loads(path.with_name(path.name + STAMP_SUFFIX).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def load_snapshot(path: Path = SURVEY_SNAPSHOT_PATH) -> "pd.DataFrame":
+    import pandas as pd
+
+    with open(path, "r", encoding="utf-8") as file:
+        return pd.DataFrame([json.loads(line) for line in file if line.strip()])
+
+
+def write_snapshot(records: list[dict], source: str, path: Path = SURVEY_SNAPSHOT_PATH) -> bool:
+    text = "".join(json.dumps(record) + "\n" for record in records)
+    try:
+        if path.read_text(encoding="utf-8") == text:
+            return False
+    except OSError:
+        pass
+    for target, content in (
+        (path, text),
+        (
+            path.with_name(path.name + STAMP_SUFFIX),
+            json.dumps(
+                {
+                    "source": source,
+                    "synced": datetime.now().isoformat(timespec="seconds"),
+                    "rows": len(records),
+                }
+            ),
+        ),
+    ):
+        write_text_atomic(target, content)
+    return True
+
+
+def sync_from_hub(path: Path = SURVEY_SNAPSHOT_PATH) -> bool:
+    from datasets import load_dataset
+
+    return write_snapshot(
+        load_dataset(HUB_DATASET, split="train").to_list(), f"hub:{HUB_DATASET}", path
+    )
+
+
+def sync_from_file(in_path: Path, path: Path = SURVEY_SNAPSHOT_PATH) -> bool:
+    with open(in_path, "r", encoding="utf-8") as file:
+        records = [json.loads(line) for line in file if line.strip()]
+    return write_snapshot(records, f"file:{in_path.name}", path)
+
+
+class SnapshotRefresher:
+    def __init__(self, path: Path = SURVEY_SNAPSHOT_PATH, interval: float = REFRESH_SECONDS):
+        self.path = path
+        self.interval = interval
+        self._thread = Thread(target=self._run, name="survey-snapshot-refresh", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                if sync_from_hub(self.path):
+                    print("Updated survey snapshot %s" % self.path)
+            # Offline hosts keep serving the snapshot they have
+            except Exception as error:
+                print("Could not refresh survey snapshot:", error)
+            time.sleep(self.interval)
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Update the local snapshot of the survey answers")
+    parser.add_argument(
+        "--from-file",
+        type=Path,
+        default=None,
+        help="Take the answers from e.g. the output of dev/extract-survey-dataset.py instead",
+    )
+    parser.add_argument("--out-path", type=Path, default=SURVEY_SNAPSHOT_PATH)
+    args = parser.parse_args()
+    if args.from_file is None:
+        changed = sync_from_hub(args.out_path)
+    else:
+        changed = sync_from_file(args.from_file, args.out_path)
+    print(("Updated %s" if changed else "%s already up to date") % args.out_path)
@@ -1,48 +1,89 @@
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from io import BytesIO
+from typing import TYPE_CHECKING, Optional
 from threading import Lock
 
 import streamlit as st
-import numpy as np
-import pandas as pd
-from matplotlib import pyplot as plt
-from datasets import load_dataset
+
+# The data and plotting stack is only imported once the article is actually opened
+if TYPE_CHECKING:
+    import pandas as pd
 
 plt_lock = Lock()
 
 
 from .base import BaseArticle
-from ..analysis.survey_dataset import (
-    plot_demographics,
-    compute_bradley_terry,
-    visualize_bradley_terry_ranking,
-)
-
-
-@st.cache_data
-def get_dataset() -> Optional[pd.DataFrame]:
-    try:
-        return pd.DataFrame(
-            load_dataset("sorenmulli/danoliterate-survey-answers", split="train")
-        )
-    except ConnectionError as error:
-        print("Got connection error:", error)
+
+
+@st.cache_resource
+def start_dataset_refresh():
+    from ..analysis.survey_snapshot import SnapshotRefresher
+
+    return SnapshotRefresher()
+
+
+@st.cache_data(max_entries=2)
+def load_dataset_version(version: str) -> "pd.DataFrame":
+    from ..analysis.survey_snapshot import load_snapshot
+
+    return load_snapshot()
+
+
+# The local snapshot of the answers and its version, updated in the background
+def get_dataset() -> Optional[tuple["pd.DataFrame", str]]:
+    from ..analysis.survey_snapshot import snapshot_version
+
+    start_dataset_refresh()
+    if (version := snapshot_version()) is None:
         return None
+    return load_dataset_version(version), version
 
 
-def display_results(survey_df):
+@dataclass
+class SurveyAnalytics:
+    n_tests: int
+    n_models: int
+    n_users: int
+    bradley_terry_results: "pd.DataFrame"
+    n_bootstrap_samples: int
+    # Figures rendered to PNG
+    demographics_png: bytes
+    inputs_png: bytes
+    ranking_png: bytes
+
+
+def _figure_png(fig) -> bytes:
+    from matplotlib import pyplot as plt
+
+    # Rendered like st.pyplot does
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight", dpi=200)
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+# Computed and rendered once per version of the dataset, visitors are served the results
+@st.cache_data(max_entries=4)
+def compute_survey_analytics(_survey_df: "pd.DataFrame", version: str) -> SurveyAnalytics:
+    import numpy as np
+    import pandas as pd
+    from matplotlib import pyplot as plt
+
+    from ..analysis.survey_dataset import (
+        BT_BOOTSTRAP_SAMPLES,
+        plot_demographics,
+        bootstrap_bradley_terry,
+        visualize_bradley_terry_ranking,
+    )
+
+    survey_df = _survey_df
     survey_models = list(
         set(np.concatenate((survey_df["model_A"], survey_df["model_B"])))
     )
-    st.write(
-        "So far, we have collected `%i` A/B tests for `%i` models from `%i` unique users"
-        % (len(survey_df), len(survey_models), len(survey_df["session-id"].unique()))
-    )
     grouped_df = survey_df.groupby("session-id").first().reset_index()
-    st.write(
-        "Many of these are male, young, and have a high level of experience in GLLMs:"
-    )
+    # Intervals resample whole sessions, as the votes of one user are not independent
+    bradley_terry_results, _ = bootstrap_bradley_terry(survey_df)
     with plt_lock:
         fig, axes = plt.subplots(2, 2, figsize=(6, 6))
         plot_demographics(
@@ -71,12 +112,8 @@ def display_results(survey_df):
             valuesort=True,
         )
         fig.tight_layout()
-        st.pyplot(fig)
+        demographics_png = _figure_png(fig)
 
-    st.write("Future expansion of the survey should target a wider demographic.")
-    st.write("Let's go to some high-level impressions from their answers:")
-
-    with plt_lock:
         fig, axes = plt.subplots(2, 2, figsize=(6, 6))
         plot_demographics(axes[0][0], survey_df, "prefer", "Global Preferences")
         plot_demographics(
@@ -108,7 +145,38 @@ def display_results(survey_df):
         )
         plot_demographics(axes[1][1], survey_df, "index", "A/B Test Session Index")
         fig.tight_layout()
-        st.pyplot(fig)
+        inputs_png = _figure_png(fig)
+
+        ranking_png = _figure_png(
+            visualize_bradley_terry_ranking(bradley_terry_results[["BT coefficient", "SE"]])
+        )
+    return SurveyAnalytics(
+        n_tests=len(survey_df),
+        n_models=len(survey_models),
+        n_users=len(survey_df["session-id"].unique()),
+        bradley_terry_results=bradley_terry_results,
+        n_bootstrap_samples=BT_BOOTSTRAP_SAMPLES,
+        demographics_png=demographics_png,
+        inputs_png=inputs_png,
+        ranking_png=ranking_png,
+    )
+
+
+def display_results(survey_df: "pd.DataFrame", version: str):
+    analytics = compute_survey_analytics(survey_df, version)
+    st.write(
+        "So far, we have collected `%i` A/B tests for `%i` models from `%i` unique users"
+        % (analytics.n_tests, analytics.n_models, analytics.n_users)
+    )
+    st.write(
+        "Many of these are male, young, and have a high level of experience in GLLMs:"
+    )
+    st.image(analytics.demographics_png, use_column_width=True)
+
+    st.write("Future expansion of the survey should target a wider demographic.")
+    st.write("Let's go to some high-level impressions from their answers:")
+
+    st.image(analytics.inputs_png, use_column_width=True)
     st.write(
         "On the inputs, people are able to decide a winner in most cases and, nicely, give well symmetrically distributed scores. "
         "Most users see the required 3 prompts, other keep going and see more before choosing a winner. "
@@ -117,7 +185,7 @@ def display_results(survey_df):
     )
     st.write(
         "But the most interesting thing: *The ranking!* "
-        f"We have a dataset of `{len(survey_df)}` pairwise preferences and want to transform that into one overall ranking. "
+        f"We have a dataset of `{analytics.n_tests}` pairwise preferences and want to transform that into one overall ranking. "
         "This classical problem in the literature of learning to rank is approached by the authors of the LmSys Chatbot Arena "
         "using the Bradley-Terry model [chiang-et-al]. The central modelling decision is to estimate the probablity that model $m_A$ "
         "is preferred over model $m_B$ logistically as"
@@ -127,22 +195,23 @@ def display_results(survey_df):
         r"Where $\theta_{m_A}, \theta_{m_B}$ are learned nonparametrically from the data using maximum likelihood estimation "
         " following Section 4 and Appendix B in [chiang-et-al] which we verified using their open-source implementation."
     )
-    bradley_terry_results = compute_bradley_terry(survey_df)
     st.write(
         r"The coefficient $\theta_m$ thus induces a ranking (higher is better) as well as an uncertainty. "
         "Our found estimates of both are shown below:"
     )
     # TODO: Consider to prettify table
-    st.dataframe(bradley_terry_results)
+    st.dataframe(analytics.bradley_terry_results)
+    st.caption(
+        "The 95%% intervals of coefficient and rank are percentiles over `%i` refits to resampled "
+        "user sessions." % analytics.n_bootstrap_samples
+    )
     st.write(
             "In the below figure these results visualized. "
             "Here, they are scaled from [-1, 1] to [0, 100] and pairwise statistical significance is shown: "
             "If there is no significant difference at $\\alpha=0.05$ between two models, their nodes are connected. "
             "The pairwise tests have been Benjamini-Hochberg corrected for multiple comparisons."
     )
-    with plt_lock:
-        fig = visualize_bradley_terry_ranking(bradley_terry_results)
-        st.pyplot(fig)
+    st.image(analytics.ranking_png, use_column_width=True)
 
 
 @dataclass
@@ -208,9 +277,11 @@ All data is saved live during interaction.
 
         st.subheader("3. Survey Results")
         with st.spinner("Loading newest answers..."):
-            survey_df = get_dataset()
-        if survey_df is not None:
-            display_results(survey_df)
+            dataset = get_dataset()
+        if dataset is not None:
+            display_results(*dataset)
+        else:
+            st.info("The survey answers have not been fetched yet, please check back later.")
 
         st.subheader("4. Conclusions")
         st.write(
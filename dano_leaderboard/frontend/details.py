@@ -1,23 +1,16 @@
+import pickle
+from functools import cache
+
 import yaml
 from pathlib import Path
 
 from ..constants import ASSETS_PATH
+from ..files import atomic_path
 
-MODELS = []
-for path in (ASSETS_PATH / "models").glob("*.yaml"):
-    with path.open("r") as file:
-        MODELS.append(yaml.safe_load(file))
-MODEL_DICT = {model["model"]: model for model in MODELS}
-DIMENSIONS_TO_HIDE_MODELS = {
-    "Capability": {},
-    "Efficiency": {
-        "Mixtral (@ Groq)",
-        "Constant Baseline",
-        *[model for model, details in MODEL_DICT.items() if details.get("closed", True)],
-    },
-    "Calibration": {},
-    "Toxicity": {},
-}
+# Compiled bundle of all parsed YAML files, rebuilt when any of them change. Pickled as
+# YAML values such as dates have no JSON equivalent
+DETAILS_CACHE_PATH = ASSETS_PATH / ".details-cache.pickle"
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 _SCENARIOS = [
     "Citizenship Test",
@@ -29,10 +22,6 @@ _SCENARIOS = [
     "DaNE",
     "Angry Tweets",
 ]
-SCENARIOS = []
-for scenario in _SCENARIOS:
-    with open(ASSETS_PATH / "scenarios" / f"{scenario}.yaml", "r") as file:
-        SCENARIOS.append(yaml.safe_load(file))
 
 _METRICS = [
     "Accuracy (NLG Parsing of chosen option)",
@@ -52,8 +41,72 @@ _METRICS = [
     "ECE Calibration (LM)",
     "Generated Text Offensive Prob",
 ]
-METRICS = []
-for metric in _METRICS:
-    with open(ASSETS_PATH / "metrics" / f"{metric}.yaml", "r") as file:
-        METRICS.append(yaml.safe_load(file))
-METRIC_DICT = {metric["metric"]: metric for metric in METRICS}
+
+
+def _detail_paths() -> dict[str, list[Path]]:
+    return {
+        "models": list((ASSETS_PATH / "models").glob("*.yaml")),
+        "scenarios": [ASSETS_PATH / "scenarios" / f"{scenario}.yaml" for scenario in _SCENARIOS],
+        "metrics": [ASSETS_PATH / "metrics" / f"{metric}.yaml" for metric in _METRICS],
+    }
+
+
+def _load_yaml(path: Path) -> dict:
+    with path.open("r") as file:
+        return yaml.load(file, Loader=YAML_LOADER)
+
+
+@cache
+def load_details() -> dict[str, list[dict]]:
+    paths = _detail_paths()
+    key = {
+        str(path.relative_to(ASSETS_PATH)): path.stat().st_mtime_ns
+        for kind_paths in paths.values()
+        for path in kind_paths
+    }
+    try:
+        bundle = pickle.loads(DETAILS_CACHE_PATH.read_bytes())
+        if bundle["key"] == key:
+            return bundle["details"]
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError, KeyError, TypeError):
+        pass
+    details = {
+        kind: [_load_yaml(path) for path in kind_paths] for kind, kind_paths in paths.items()
+    }
+    try:
+        with atomic_path(DETAILS_CACHE_PATH) as tmp_path:
+            tmp_path.write_bytes(pickle.dumps({"key": key, "details": details}))
+    except OSError:
+        pass
+    return details
+
+
+def _dimensions_to_hide_models() -> dict[str, set]:
+    return {
+        "Capability": {},
+        "Efficiency": {
+            "Mixtral (@ Groq)",
+            "Constant Baseline",
+            *[model["model"] for model in load_details()["models"] if model.get("closed", True)],
+        },
+        "Calibration": {},
+        "Toxicity": {},
+    }
+
+
+# Loaded on first access of e.g. details.MODELS such that importing is free
+_LAZY_DETAILS = {
+    "MODELS": lambda: load_details()["models"],
+    "MODEL_DICT": lambda: {model["model"]: model for model in load_details()["models"]},
+    "DIMENSIONS_TO_HIDE_MODELS": _dimensions_to_hide_models,
+    "SCENARIOS": lambda: load_details()["scenarios"],
+    "METRICS": lambda: load_details()["metrics"],
+    "METRIC_DICT": lambda: {metric["metric"]: metric for metric in load_details()["metrics"]},
+}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_DETAILS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value = _LAZY_DETAILS[name]()
+    return value
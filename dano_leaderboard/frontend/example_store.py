@@ -0,0 +1,80 @@
+import csv
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+from ..constants import EXAMPLES_COMPILED_PATH, EXAMPLES_PATH
+from ..files import atomic_path
+
+COMPILED_SUFFIX = ".feather"
+INDEX_COLUMN = "label"
+PROMPT_COLUMN = "prompt"
+
+
+@dataclass(frozen=True)
+class ScenarioExamples:
+    scenario: str
+    csv_path: Path
+    # Header of the CSV: Index column, prompt column and one column per model
+    columns: tuple[str, ...]
+
+    @property
+    def models(self) -> list[str]:
+        return [col for col in self.columns[1:] if col != PROMPT_COLUMN]
+
+    @property
+    def compiled_path(self) -> Path:
+        return EXAMPLES_COMPILED_PATH / (self.csv_path.stem + COMPILED_SUFFIX)
+
+    def is_compiled(self) -> bool:
+        try:
+            return self.compiled_path.stat().st_mtime_ns >= self.csv_path.stat().st_mtime_ns
+        except OSError:
+            return False
+
+    def load(self, model: str) -> pd.DataFrame:
+        # Only the prompts and the generations of the chosen model are read
+        if self.is_compiled():
+            return (
+                pd.read_feather(self.compiled_path, columns=[INDEX_COLUMN, PROMPT_COLUMN, model])
+                .set_index(INDEX_COLUMN)
+                .rename_axis(None)
+            )
+        return pd.read_csv(
+            self.csv_path,
+            index_col=0,
+            usecols=[0, self.columns.index(PROMPT_COLUMN), self.columns.index(model)],
+        )
+
+    def compile(self):
+        EXAMPLES_COMPILED_PATH.mkdir(parents=True, exist_ok=True)
+        with atomic_path(self.compiled_path) as tmp_path:
+            frame = pd.read_csv(self.csv_path, index_col=0).rename_axis(INDEX_COLUMN)
+            frame.reset_index().to_feather(tmp_path)
+
+
+# Index of the example outputs built from the CSV headers alone, no generations are parsed
+@dataclass(frozen=True)
+class ExampleStore:
+    scenarios: dict[str, ScenarioExamples]
+
+    @classmethod
+    def index(cls, path: Path = EXAMPLES_PATH) -> "ExampleStore":
+        scenarios = {}
+        for csv_path in sorted(path.resolve().glob("*.csv")):
+            with csv_path.open("r", encoding="utf-8", newline="") as file:
+                columns = tuple(next(csv.reader(file)))
+            scenarios[csv_path.stem] = ScenarioExamples(csv_path.stem, csv_path, columns)
+        return cls(scenarios)
+
+    def compile(self):
+        for examples in self.scenarios.values():
+            if not examples.is_compiled():
+                examples.compile()
+
+
+if __name__ == "__main__":
+    store = ExampleStore.index()
+    store.compile()
+    print("Compiled %i example scenarios to %s" % (len(store.scenarios), EXAMPLES_COMPILED_PATH))
@@ -0,0 +1,83 @@
+import streamlit as st
+import pandas as pd
+from . import details
+from .example_store import ExampleStore
+from .layouts import set_global_style
+
+# Loaded scenario/model generations shared between sessions, least recently used are evicted
+EXAMPLES_CACHE_ENTRIES = 32
+EXAMPLES_PAGE_SIZES = [5, 10, 25, 50]
+EXAMPLES_PAGE_CACHE_ENTRIES = 256
+
+
+@st.cache_resource
+def fetch_example_store() -> ExampleStore:
+    return ExampleStore.index()
+
+
+@st.cache_resource(max_entries=EXAMPLES_CACHE_ENTRIES)
+def fetch_examples(scenario: str, model: str) -> pd.DataFrame:
+    return fetch_example_store().scenarios[scenario].load(model)
+
+
+@st.cache_data(max_entries=EXAMPLES_PAGE_CACHE_ENTRIES)
+def search_examples(scenario: str, model: str, query: str) -> list[int]:
+    prompts = fetch_examples(scenario, model)["prompt"].astype(str)
+    if not query:
+        return list(range(len(prompts)))
+    return prompts.str.contains(query, case=False, regex=False).to_numpy().nonzero()[0].tolist()
+
+
+@st.cache_data(max_entries=EXAMPLES_PAGE_CACHE_ENTRIES)
+def render_examples_page(
+    scenario: str, model: str, query: str, page: int, page_size: int
+) -> list[tuple[str, str, str]]:
+    rows = search_examples(scenario, model, query)[(page - 1) * page_size : page * page_size]
+    data = fetch_examples(scenario, model).iloc[rows]
+    return [
+        (str(label), str(prompt), str(generation))
+        for label, prompt, generation in zip(data.index, data["prompt"], data[model])
+    ]
+
+
+def build_examples():
+    set_global_style()
+    st.title("Danoliterate GLLM Prediction Examples")
+    st.write(
+        """
+Inspect some model outputs on the benchmark from selected models.
+"""
+    )
+    store = fetch_example_store()
+    chosen_scenario = (
+        st.selectbox("Scenario", [scenario["scenario"] for scenario in details.SCENARIOS])
+        or details.SCENARIOS[0]["scenario"]
+    )
+    chosen_model = st.selectbox("Model", store.scenarios[chosen_scenario].models)
+    # Remembered such that searching and paging does not hide the examples again
+    if st.button("Show output examples"):
+        st.session_state["show_examples"] = True
+    if not st.session_state.get("show_examples"):
+        return
+    search_col, size_col, page_col = st.columns([3, 1, 1])
+    query = search_col.text_input("Search prompts").strip()
+    page_size = size_col.selectbox("Examples per page", EXAMPLES_PAGE_SIZES, index=1)
+    n_examples = len(search_examples(chosen_scenario, chosen_model, query))
+    n_pages = max(1, -(-n_examples // page_size))
+    page = min(page_col.number_input("Page", min_value=1, max_value=n_pages, value=1), n_pages)
+    st.caption(
+        "Showing %i-%i of %i examples"
+        % (
+            min(n_examples, (page - 1) * page_size + 1),
+            min(n_examples, page * page_size),
+            n_examples,
+        )
+    )
+    for label, prompt, generation in render_examples_page(
+        chosen_scenario, chosen_model, query, page, page_size
+    ):
+        st.markdown(f"### Prompt {label}")
+        st.code(prompt, language=None)
+        st.markdown(f"### {chosen_model} Generation {label}")
+        st.code(generation, language=None)
+        st.divider()
@@ -1,12 +1,6 @@
-from collections import defaultdict
 import streamlit as st
-import pandas as pd
-from ..backend.data import Result, ResultDump
-from ..constants import ASSETS_PATH, RESULT_PATH
-from .result_parsing import DIMENSIONS_TO_METRICS, select_results
-from .table import CLOSED_EMOJI, INSTRUCT_EMOJI, PARAMS_EMOJI, WIN_EMOJI, construct_table
-from .details import METRIC_DICT, MODELS, SCENARIOS
-from .survey.set_up import build_survey_pages
+from ..constants import ASSETS_PATH
+from . import details
 from .articles import ALL_ARTICLES
 
 
@@ -36,110 +30,6 @@ def build_hello():
     st.write(hello_content)
 
 
-@st.cache_data
-def fetch_results_cached() -> ResultDump:
-    return ResultDump.deserialize(RESULT_PATH)
-
-
-def group_results_by_metrics(results: list[Result]):
-    metrics_to_models = defaultdict(list)
-    for res in results:
-        metrics_to_models[tuple(metric.name for metric in res.metrics)].append(res)
-    return metrics_to_models
-
-
-def build_metric_selection_sidebar(results: list[Result]):
-    with st.sidebar, st.form(key="metric_selection"):
-        for scenario_dict in SCENARIOS:
-            scenario = scenario_dict["scenario"]
-            scenario_res = [res for res in results if res.scenario == scenario]
-            if not scenario_res:
-                continue
-            st.subheader(f"Choose :blue[{scenario}] Metrics")
-            result_groups = group_results_by_metrics(scenario_res)
-            for metrics, result_group in result_groups.items():
-                options = list(metrics)
-                model_names = (
-                    "All Models"
-                    if len(result_groups) == 1
-                    else "Rest of Models"
-                    if len(result_groups) == 2
-                    and len(result_group) > sum(len(group) for group in result_groups.values()) // 2
-                    else ", ".join(res.model for res in result_group)
-                )
-                selected_metric = st.selectbox(
-                    f"Metric for {model_names}",
-                    options,
-                    index=options.index(result_group[0].chosen_metric.name),
-                    key=scenario + model_names,
-                )
-                for res in result_group:
-                    res.chosen_metric = next(
-                        metric for metric in res.metrics if metric.name == selected_metric
-                    )
-                st.caption(
-                    f"Currently showing: {selected_metric}.",
-                    help=METRIC_DICT[selected_metric]["description"]
-                    if selected_metric in METRIC_DICT
-                    else "",
-                )
-        st.form_submit_button(label="Submit")
-
-
-def build_leaderboard():
-    set_global_style(wide=True)
-    st.title("Danoliterate GLLM Leaderboard")
-    st.warning(
-        "The benchmark is still work-in-progress."
-        " Evaluation dimensions beyond capability are experimental",
-        icon="⌛",
-    )
-    st.write(
-        f"""
-- Visit the 🇩🇰 Hello page to get an overview of what this is.
-- Note that the below table can be expanded.
-- Hover over table column headers for more details.
-- See left sidebar for metric details and to change displayed metrics.
-- Visit the 📚 Scenarios page to read about each evaluation scenario.
-- Visit the 🤖 Models page to read about tested models.
-"""
-    )
-
-    result_dump = fetch_results_cached()
-
-    show_missing = st.checkbox("Include models with missing values")
-    index_type = st.selectbox("Index Average", ["Micro Avg.", "Macro Avg."])
-    index_micro = index_type == "Micro Avg."
-    chosen_dimension = (
-        st.selectbox("Evaluation Dimension", DIMENSIONS_TO_METRICS.keys())
-        or list(DIMENSIONS_TO_METRICS.keys())[0]
-    )
-    select_results(result_dump, chosen_dimension)
-    build_metric_selection_sidebar(result_dump.results)
-    table = construct_table(result_dump, index_micro, show_missing)
-    st.dataframe(
-        table,
-        use_container_width=True,
-        column_config={
-            INSTRUCT_EMOJI: st.column_config.Column(
-                help="Checked if model has been instruct-tuned."
-            ),
-            CLOSED_EMOJI: st.column_config.Column(
-                help="Checked if model weights have not been made openly available."
-            ),
-            PARAMS_EMOJI: st.column_config.Column(
-                help="Number of model parameters in billions, if known."
-            ),
-            WIN_EMOJI: st.column_config.Column(
-                help=f"{index_type} of scenario index scores where 100=best, 0=worst."
-            ),
-        },
-    )
-    st.caption(
-        f"Newest evaluation was from {result_dump.last_change} using [sorenmulli/danoliterate](https://github.com/sorenmulli/danoliterate) @ `{result_dump.last_commit[:6]}`."
-    )
-
-
 def build_scenarios():
     set_global_style()
     st.title("Danoliterate Benchmark Scenarios")
@@ -152,7 +42,7 @@ See examples of data and prompting on the 🔎Examples page.
 For more details, read the original Master's thesis chapters 4.2 and 5.3: [''Are GLLMs Danoliterate? Benchmarking Generative NLP in Danish''](https://sorenmulli.github.io/thesis/thesis.pdf).
 """
     )
-    for i, scenario in enumerate(SCENARIOS):
+    for i, scenario in enumerate(details.SCENARIOS):
         if i:
             st.divider()
         st.subheader(scenario["scenario"])
@@ -177,7 +67,7 @@ See below for description of evaluated models.
 To be sure to get accurate details, consult original model creators.
 """
     )
-    for i, model in enumerate(MODELS):
+    for i, model in enumerate(details.MODELS):
         if i:
             st.divider()
         st.subheader(model["model"])
@@ -195,37 +85,6 @@ To be sure to get accurate details, consult original model creators.
         st.write(model.get("description") or "")
 
 
-def build_examples():
-    set_global_style()
-    st.title("Danoliterate GLLM Prediction Examples")
-    st.write(
-        """
-Inspect some model outputs on the benchmark from selected models.
-"""
-    )
-    scenarios = {
-        scenario.stem.replace(".csv", ""): pd.read_csv(scenario, index_col=0)
-        for scenario in sorted((ASSETS_PATH / "example-outputs").resolve().glob("*.csv"))
-    }
-    chosen_scenario = (
-        st.selectbox("Scenario", [scenario["scenario"] for scenario in SCENARIOS])
-        or SCENARIOS[0]["scenario"]
-    )
-    data = scenarios[chosen_scenario]
-    chosen_model = st.selectbox("Model", [col for col in data.columns if col != "prompt"])
-    if st.button("Show output examples"):
-        for label, row in data.iterrows():
-            st.markdown(f"### Prompt {label}")
-            st.code(row["prompt"], language=None)
-            st.markdown(f"### {chosen_model} Generation {label}")
-            st.code(row[chosen_model], language=None)
-            st.divider()
-
-
-def build_survey():
-    set_global_style(wide=True, title="Spørgeskema [Da.]", sidebar="collapsed")
-    build_survey_pages()
-
 def build_articles():
     set_global_style(title="Articles")
     st.title("Articles about the Danoliterate Benchmark")
@@ -0,0 +1,177 @@
+from collections import defaultdict
+import streamlit as st
+import pandas as pd
+from ..backend.data import Metric, Result, ResultColumns, ResultDump
+from ..constants import RESULT_BINARY_PATH, RESULT_PATH
+from .result_parsing import DIMENSIONS_TO_METRICS, DimensionView, select_all_dimensions
+from .table import (
+    CLOSED_EMOJI,
+    INDEX_SAMPLES,
+    INSTRUCT_EMOJI,
+    INTERVAL_EMOJI,
+    PARAMS_EMOJI,
+    RANK_EMOJI,
+    WIN_EMOJI,
+    construct_frame,
+    style,
+)
+from . import details
+from .layouts import set_global_style
+
+# Rendered leaderboard tables kept per worker, least recently used are evicted first
+LEADERBOARD_CACHE_ENTRIES = 256
+INDEX_SAMPLE_OPTIONS = [100, INDEX_SAMPLES, 10 * INDEX_SAMPLES]
+
+
+def binary_dump_is_fresh() -> bool:
+    # The extraction writes the JSON dump, a binary dump converted before then is stale
+    try:
+        binary_mtime = RESULT_BINARY_PATH.stat().st_mtime_ns
+    except OSError:
+        return False
+    try:
+        return binary_mtime >= RESULT_PATH.stat().st_mtime_ns
+    except OSError:
+        return True
+
+
+@st.cache_resource
+def fetch_result_columns() -> ResultColumns:
+    # Memory-mapped and shared by all sessions of the worker when the binary dump is up to date
+    if binary_dump_is_fresh():
+        return ResultColumns.load(RESULT_BINARY_PATH)
+    return ResultColumns.from_dump(ResultDump.deserialize(RESULT_PATH))
+
+
+@st.cache_resource
+def fetch_dimension_views() -> dict[str, DimensionView]:
+    # Computed once per process and shared by all sessions, see DimensionView
+    return select_all_dimensions(fetch_result_columns())
+
+
+# Keyed by the selection fingerprint, so the sampled intervals are also computed once per selection
+@st.cache_data(max_entries=LEADERBOARD_CACHE_ENTRIES)
+def construct_frame_cached(
+    dimension: str,
+    metric_choice: tuple[tuple[str, ...], ...],
+    micro: bool,
+    show_missing: bool,
+    n_samples=0,
+) -> pd.DataFrame:
+    view = fetch_dimension_views()[dimension]
+    return construct_frame(view, micro, show_missing, view.chosen_metrics(metric_choice), n_samples)
+
+
+def group_results_by_metrics(results: list[Result]):
+    metrics_to_models = defaultdict(list)
+    for res in results:
+        metrics_to_models[tuple(metric.name for metric in res.metrics)].append(res)
+    return metrics_to_models
+
+
+def build_metric_selection_sidebar(results: tuple[Result, ...]) -> dict[tuple, Metric]:
+    chosen_metrics: dict[tuple, Metric] = {}
+    with st.sidebar, st.form(key="metric_selection"):
+        for scenario_dict in details.SCENARIOS:
+            scenario = scenario_dict["scenario"]
+            scenario_res = [res for res in results if res.scenario == scenario]
+            if not scenario_res:
+                continue
+            st.subheader(f"Choose :blue[{scenario}] Metrics")
+            result_groups = group_results_by_metrics(scenario_res)
+            for metrics, result_group in result_groups.items():
+                options = list(metrics)
+                model_names = (
+                    "All Models"
+                    if len(result_groups) == 1
+                    else "Rest of Models"
+                    if len(result_groups) == 2
+                    and len(result_group) > sum(len(group) for group in result_groups.values()) // 2
+                    else ", ".join(res.model for res in result_group)
+                )
+                selected_metric = st.selectbox(
+                    f"Metric for {model_names}",
+                    options,
+                    index=options.index(result_group[0].chosen_metric.name),
+                    key=scenario + model_names,
+                )
+                for res in result_group:
+                    chosen_metrics[res.key] = next(
+                        metric for metric in res.metrics if metric.name == selected_metric
+                    )
+                st.caption(
+                    f"Currently showing: {selected_metric}.",
+                    help=details.METRIC_DICT[selected_metric]["description"]
+                    if selected_metric in details.METRIC_DICT
+                    else "",
+                )
+        st.form_submit_button(label="Submit")
+    return chosen_metrics
+
+
+def build_leaderboard():
+    set_global_style(wide=True)
+    st.title("Danoliterate GLLM Leaderboard")
+    st.warning(
+        "The benchmark is still work-in-progress."
+        " Evaluation dimensions beyond capability are experimental",
+        icon="⌛",
+    )
+    st.write(
+        f"""
+- Visit the 🇩🇰 Hello page to get an overview of what this is.
+- Note that the below table can be expanded.
+- Hover over table column headers for more details.
+- See left sidebar for metric details and to change displayed metrics.
+- Visit the 📚 Scenarios page to read about each evaluation scenario.
+- Visit the 🤖 Models page to read about tested models.
+"""
+    )
+
+    views = fetch_dimension_views()
+
+    show_missing = st.checkbox("Include models with missing values")
+    index_type = st.selectbox("Index Average", ["Micro Avg.", "Macro Avg."])
+    index_micro = index_type == "Micro Avg."
+    chosen_dimension = (
+        st.selectbox("Evaluation Dimension", DIMENSIONS_TO_METRICS.keys())
+        or list(DIMENSIONS_TO_METRICS.keys())[0]
+    )
+    n_samples = 0
+    if st.checkbox("Show index uncertainty"):
+        n_samples = st.select_slider(
+            "Samples of metric values", INDEX_SAMPLE_OPTIONS, value=INDEX_SAMPLES
+        )
+    view = views[chosen_dimension]
+    chosen_metrics = build_metric_selection_sidebar(view.results)
+    table = construct_frame_cached(
+        chosen_dimension, view.metric_choice(chosen_metrics), index_micro, show_missing, n_samples
+    ).style.pipe(style)
+    st.dataframe(
+        table,
+        use_container_width=True,
+        column_config={
+            INSTRUCT_EMOJI: st.column_config.Column(
+                help="Checked if model has been instruct-tuned."
+            ),
+            CLOSED_EMOJI: st.column_config.Column(
+                help="Checked if model weights have not been made openly available."
+            ),
+            PARAMS_EMOJI: st.column_config.Column(
+                help="Number of model parameters in billions, if known."
+            ),
+            WIN_EMOJI: st.column_config.Column(
+                help=f"{index_type} of scenario index scores where 100=best, 0=worst."
+            ),
+            INTERVAL_EMOJI: st.column_config.Column(
+                help="95% interval of the index when resampling metric values from their"
+                " uncertainties."
+            ),
+            RANK_EMOJI: st.column_config.Column(
+                help="95% interval of the rank of the model over the same samples."
+            ),
+        },
+    )
+    st.caption(
+        f"Newest evaluation was from {view.last_change} using [sorenmulli/danoliterate](https://github.com/sorenmulli/danoliterate) @ `{view.last_commit[:6]}`."
+    )
@@ -1,5 +1,10 @@
-from ..backend.data import Result, ResultDump
-from .details import DIMENSIONS_TO_HIDE_MODELS
+from dataclasses import dataclass, replace
+from typing import Union
+
+import numpy as np
+
+from ..backend.data import Metric, Result, ResultColumns, ResultDump
+from . import details
 
 
 DIMENSIONS_TO_METRICS = {
@@ -33,16 +38,99 @@ DIMENSIONS_TO_METRICS = {
 def filter_available(result: Result, dimension: str):
     approved_metrics = DIMENSIONS_TO_METRICS[dimension]
     filtered_metrics = [metric for metric in result.metrics if metric.name in approved_metrics]
-    if result.model in DIMENSIONS_TO_HIDE_MODELS[dimension]:
+    if result.model in details.DIMENSIONS_TO_HIDE_MODELS[dimension]:
         return []
     return sorted(filtered_metrics, key=lambda metric: approved_metrics.index(metric.name))
 
 
-def select_results(dump: ResultDump, dimension: str):
+# The results of a dump restricted to the metrics of one dimension. Views are shared
+# between sessions so neither they nor their results may be modified: Metric choices
+# are passed along separately, keyed by result key
+@dataclass(frozen=True)
+class DimensionView:
+    dimension: str
+    last_change: str
+    last_commit: str
+
+    results: tuple[Result, ...]
+
+    def metric_choice(self, chosen_metrics: dict[tuple, Metric]) -> tuple[tuple[str, ...], ...]:
+        # Hashable fingerprint of the choices that differ from the default metrics
+        return tuple(
+            sorted(
+                (*res.key, chosen_metrics[res.key].name)
+                for res in self.results
+                if res.key in chosen_metrics and chosen_metrics[res.key] != res.chosen_metric
+            )
+        )
+
+    def chosen_metrics(self, metric_choice: tuple[tuple[str, ...], ...]) -> dict[tuple, Metric]:
+        names = {(model, scenario): name for model, scenario, name in metric_choice}
+        return {
+            res.key: next(metric for metric in res.metrics if metric.name == names[res.key])
+            for res in self.results
+            if res.key in names
+        }
+
+
+def select_results(dump: ResultDump, dimension: str) -> DimensionView:
     filtered_results: list[Result] = []
     for res in dump.results:
-        res.metrics = filter_available(res, dimension)
-        if res.metrics:
-            res.chosen_metric = res.metrics[0]
-            filtered_results.append(res)
-    dump.results = filtered_results
+        if metrics := filter_available(res, dimension):
+            filtered_results.append(replace(res, metrics=metrics, chosen_metric=metrics[0]))
+    return DimensionView(dimension, dump.last_change, dump.last_commit, tuple(filtered_results))
+
+
+# Same view as select_results on columns.to_dump(), but only the results and metrics of the
+# dimension are turned into objects, the rest stay in the (memory-mapped) columns
+def select_columns(columns: ResultColumns, dimension: str) -> DimensionView:
+    approved_metrics = DIMENSIONS_TO_METRICS[dimension]
+    hidden_models = details.DIMENSIONS_TO_HIDE_MODELS[dimension]
+    # Position of each metric among the approved ones of the dimension, -1 if not approved
+    name_order = np.array(
+        [
+            approved_metrics.index(name) if name in approved_metrics else -1
+            for name in columns.metric_names
+        ],
+        dtype=np.int64,
+    )
+    model_hidden = np.array([model in hidden_models for model in columns.models], dtype=bool)
+    starts = np.asarray(columns.result_metric_start)
+    metric_result = np.repeat(np.arange(len(columns)), np.diff(starts))
+    metric_order = name_order[columns.metric_name]
+    kept = np.flatnonzero((metric_order >= 0) & ~model_hidden[columns.result_model][metric_result])
+    # Grouped by result, in the order of the approved metrics like sorted() would
+    kept = kept[np.lexsort((metric_order[kept], metric_result[kept]))]
+    kept_results, bounds = np.unique(metric_result[kept], return_index=True)
+
+    metrics = [
+        Metric(columns.metric_names[name], value, None if unc != unc else unc, hib, N)
+        for name, value, unc, hib, N in zip(
+            columns.metric_name[kept].tolist(),
+            columns.metric_value[kept].tolist(),
+            columns.metric_uncertainty[kept].tolist(),
+            columns.metric_higher_is_better[kept].tolist(),
+            columns.metric_N[kept].tolist(),
+        )
+    ]
+    bounds = [*bounds.tolist(), len(kept)]
+    results = []
+    for i, result in enumerate(kept_results.tolist()):
+        result_metrics = metrics[bounds[i] : bounds[i + 1]]
+        results.append(
+            Result(
+                model=columns.models[columns.result_model[result]],
+                scenario=columns.scenarios[columns.result_scenario[result]],
+                executed=columns.executed[result],
+                scoring_id=columns.scoring_ids[result],
+                metrics=result_metrics,
+                chosen_metric=result_metrics[0],
+            )
+        )
+    return DimensionView(dimension, columns.last_change, columns.last_commit, tuple(results))
+
+
+def select_all_dimensions(dump: Union[ResultDump, ResultColumns]) -> dict[str, DimensionView]:
+    select = select_columns if isinstance(dump, ResultColumns) else select_results
+    return {dimension: select(dump, dimension) for dimension in DIMENSIONS_TO_METRICS}
+
@@ -7,7 +7,17 @@ import time
 
 import streamlit as st
 
-from .infrastructure import MIN_PROMPTS, PAIRS_TO_SHOW, STREAM_SLEEP, logger
+from .infrastructure import (
+    MIN_PROMPTS,
+    PAIRS_TO_SHOW,
+    STREAM_CHARS_PER_SECOND,
+    STREAM_MAX_SECONDS,
+    STREAM_TICK,
+    logger,
+)
+from .prompt_store import PromptStore
+
+HISTORY_CACHE_ENTRIES = 4096
 
 
 def _color_cat(text: str, category: str) -> str:
@@ -28,7 +38,7 @@ def _color_cat(text: str, category: str) -> str:
 
 
 def build_prompt_choice(
-    models: tuple[str, str], examples: list[dict]
+    models: tuple[str, str], examples: PromptStore
 ) -> tuple[Optional[int], bool]:
     st.subheader("1. Vælg prompts")
     st.caption("Udforsk de seks kategorier og vælg en prompt, der interesserer dig.")
@@ -44,17 +54,17 @@ def build_prompt_choice(
         n = 1
         with tab, st.container(height=250, border=False):
             for ex_idx in st.session_state["example_order"]:
-                example = examples[ex_idx]
-                if example["category"] != cat:
+                example = examples.prompts[ex_idx]
+                if example.category != cat:
                     continue
 
                 with st.popover(
-                    _color_cat(f"Prompt {n}:", cat) + " " + example["use_case"],
+                    _color_cat(f"Prompt {n}:", cat) + " " + example.use_case,
                     use_container_width=True,
                 ):
                     popover = st.empty()
                     with popover.container():
-                        st.write(example["prompt"].replace("\n", "\n\n"))
+                        st.write(example.prompt.replace("\n", "\n\n"))
                         choose_prompt = st.button(
                             "Prøv prompten", key=" ".join(models) + str(ex_idx)
                         )
@@ -69,33 +79,90 @@ def build_prompt_choice(
     return chosen_prompt, new_chosen
 
 
+def _word_prefix(text: str, n_chars: int) -> str:
+    if n_chars >= len(text):
+        return text
+    return text[: text.rfind(" ", 0, n_chars + 1) + 1]
+
+
+def answer_prefixes(answers: list[str], elapsed: float) -> list[str]:
+    # Both answers are typed out together, and faster when needed to finish within the budget
+    prefixes = []
+    for answer in answers:
+        chars_per_second = max(STREAM_CHARS_PER_SECOND, len(answer) / STREAM_MAX_SECONDS)
+        prefixes.append(_word_prefix(answer, int(min(elapsed * chars_per_second, len(answer)))))
+    return prefixes
+
+
+def stream_elapsed(models: tuple[str, str], prompt: int) -> float:
+    # Kept in the session state such that reruns, e.g. from other widgets, resume the stream
+    stream = st.session_state.get("stream_start")
+    if stream is None or stream[0] != (models, prompt):
+        return float("inf")
+    return time.monotonic() - stream[1]
+
+
+def show_answers(models: tuple[str, str], texts: list[str]):
+    for col, text, emoji in zip(st.columns(2), texts, "🇦🇧"):
+        with col, st.container(border=True):
+            with st.chat_message("assistant"):
+                st.write(f"**Model {emoji}**:\n")
+                st.markdown(text)
+
+
+# Redraws only itself every tick, so the script thread is not held while the answers stream
+@st.fragment(run_every=STREAM_TICK)
+def stream_answers(models: tuple[str, str], prompt: int, answers: list[str]):
+    texts = answer_prefixes(answers, stream_elapsed(models, prompt))
+    show_answers(models, texts)
+    if texts == answers:
+        # The full rerun draws the answers without the fragment, which stops the ticks
+        st.rerun()
+
+
 def build_model_answers(
-    chosen_prompt: Optional[int], new_chosen: bool, models: tuple[str, str], examples: list[dict]
+    chosen_prompt: Optional[int], new_chosen: bool, models: tuple[str, str], examples: PromptStore
 ):
     if chosen_prompt is None:
         with st.chat_message("user"):
             st.write("...")
+        return
+    with st.chat_message("user"):
+        st.write(examples.prompts[chosen_prompt].prompt)
+    answers = [examples.answer(chosen_prompt, model) for model in models]
+    if new_chosen:
+        st.session_state["stream_start"] = ((models, chosen_prompt), time.monotonic())
+    # Answers seen before are shown at once
+    if answer_prefixes(answers, stream_elapsed(models, chosen_prompt)) == answers:
+        show_answers(models, answers)
     else:
-        with st.chat_message("user"):
-            st.write(examples[chosen_prompt]["prompt"])
-        for col, model, emoji in zip(st.columns(2), models, "🇦🇧"):
-
-            def stream_data(sleep=True):
-                for i, word in enumerate(examples[chosen_prompt]["models"][model].split(" ")):
-                    yield word + " "
-                    if sleep:
-                        if i < 120:
-                            time.sleep(STREAM_SLEEP)
-                        else:
-                            time.sleep(STREAM_SLEEP / 10)
-
-            with col, st.container(border=True):
-                with st.chat_message("assistant"):
-                    st.write(f"**Model {emoji}**:\n")
-                    if new_chosen:
-                        st.write_stream(stream_data())
-                    else:
-                        st.write_stream(stream_data(sleep=False))
+        stream_answers(models, chosen_prompt, answers)
+
+
+@st.cache_data(max_entries=HISTORY_CACHE_ENTRIES)
+def render_history_entry(_examples: PromptStore, models: tuple[str, str], prompt: int) -> str:
+    return "\n\n".join(
+        [
+            f"**Prompt:** {_examples.prompts[prompt].prompt}",
+            *(
+                f"**Model {emoji}**:\n\n{_examples.answer(prompt, model)}"
+                for model, emoji in zip(models, "🇦🇧")
+            ),
+        ]
+    )
+
+
+def build_history(models: tuple[str, str], examples: PromptStore):
+    # Only rendered when asked for, and as one element no matter how many prompts were seen
+    if not st.toggle("Se tidligere svar", key=" ".join(models) + "-history"):
+        return
+    with st.container(border=True):
+        st.markdown(
+            "\n\n---\n\n".join(
+                render_history_entry(examples, models, prompt)
+                for prompt in st.session_state["seen_prompts"][models][:-1]
+            )
+        )
 
 
 def build_answer(models: tuple[str, str], survey: StreamlitSurvey, pages: Pages):
@@ -173,7 +240,7 @@ def show_status_message(survey: StreamlitSurvey, pair_idx: int):
         )
 
 
-def build_ab_test(examples: list[dict], survey: StreamlitSurvey, pages: Pages):
+def build_ab_test(examples: PromptStore, survey: StreamlitSurvey, pages: Pages):
     pair_idx = pages.current - 1
     models = st.session_state["chosen_models"][pair_idx]
     logger.debug("Displaying models %s and %s", *models)
@@ -189,11 +256,7 @@ def build_ab_test(examples: list[dict], survey: StreamlitSurvey, pages: Pages):
         st.subheader("2. Se modellernes svar")
         build_model_answers(chosen_prompt, new_chosen, models, examples)
         if len(st.session_state["seen_prompts"][models]) > 1:
-            with st.expander("Se tidligere svar"):
-                for i, prompt in enumerate(st.session_state["seen_prompts"][models][:-1]):
-                    if i:
-                        st.divider()
-                    build_model_answers(prompt, False, models, examples)
+            build_history(models, examples)
         if chosen_prompt is not None:
             st.caption("Fortsæt ved at gå til toppen af siden igen.")
     with answer_col:
@@ -4,7 +4,13 @@ from pathlib import Path
 PAIRS_TO_SHOW = 4
 MIN_PROMPTS = 3
 
-STREAM_SLEEP = 0.1
+# Answers are revealed at this pace, but faster when needed to finish within the budget
+STREAM_CHARS_PER_SECOND = 60
+STREAM_MAX_SECONDS = 10.0
+STREAM_TICK = 0.1
+
+# Every this many saved changes, the full session state is written to its log again
+SNAPSHOT_EVERY = 20
 
 OUTPUT_DIR = Path(__file__).parent.parent.parent.parent / "survey-data"
 
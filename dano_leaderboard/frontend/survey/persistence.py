@@ -0,0 +1,225 @@
+import atexit
+import json
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from queue import Empty, Full, Queue
+from threading import Event, Lock, Thread
+from typing import Optional
+
+from .infrastructure import logger
+
+SESSION_LOG = "answers.jsonl"
+TIMESTAMP_FORMAT = "%Y%m%d-%H%M%S"
+
+# Records waiting to be written before saving blocks the script thread
+WRITE_QUEUE_SIZE = 1024
+# Records written per group commit at most
+WRITE_BATCH_SIZE = 256
+# Seconds submit waits for room in a full queue before writing on the script thread itself
+SUBMIT_TIMEOUT = 5.0
+
+
+# The session state is saved as an append-only log per session: A full snapshot followed
+# by records holding only the top-level values and answers that changed since the last one
+def state_delta(old: dict, new: dict) -> dict:
+    delta = {key: val for key, val in new.items() if key != "answers" and old.get(key) != val}
+    old_answers = old.get("answers", {})
+    answers = {
+        key: val for key, val in new.get("answers", {}).items() if old_answers.get(key) != val
+    }
+    if answers:
+        delta["answers"] = answers
+    return delta
+
+
+def apply_delta(state: dict, delta: dict):
+    for key, val in delta.items():
+        if key == "answers":
+            state.setdefault("answers", {}).update(val)
+        else:
+            state[key] = val
+
+
+def session_record(state: dict, snapshot: bool) -> dict:
+    return {
+        "timestamp": datetime.now().strftime(TIMESTAMP_FORMAT),
+        "snapshot": snapshot,
+        "state": state,
+    }
+
+
+def append_records(user_path: Path, records: list[dict]):
+    user_path.mkdir(exist_ok=True)
+    with open(user_path / SESSION_LOG, "a", encoding="utf-8") as file:
+        file.write("".join(json.dumps(record) + "\n" for record in records))
+        file.flush()
+        os.fsync(file.fileno())
+
+
+@dataclass
+class WriterStats:
+    submitted: int = 0
+    written: int = 0
+    batches: int = 0
+    failed: int = 0
+    max_queue_depth: int = 0
+    # Submits that found the queue full, the time they waited and those written inline
+    blocked: int = 0
+    blocked_seconds: float = 0.0
+    written_inline: int = 0
+
+
+# Writes session records on a background thread such that disk latency does not land on the
+# script thread. Records queued while a batch is written are committed together with one
+# write and fsync per session log
+class RecordWriter:
+    def __init__(self, queue_size=WRITE_QUEUE_SIZE, batch_size=WRITE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.stats = WriterStats()
+        self._queue: Queue = Queue(maxsize=queue_size)
+        self._stats_lock = Lock()
+        # Held while checking for close and enqueueing, such that nothing is enqueued after the
+        # sentinel that stops the thread
+        self._close_lock = Lock()
+        # Sessions with lost records, until a snapshot of them is written
+        self._failed_paths: set[Path] = set()
+        self._closed = False
+        self._thread = Thread(target=self._run, name="survey-record-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def has_failed(self, user_path: Path) -> bool:
+        # Deltas build on the records before them, so the session needs a new snapshot
+        with self._stats_lock:
+            return user_path in self._failed_paths
+
+    def _written(self, user_path: Path, records: list[dict]):
+        if any(record["snapshot"] for record in records):
+            with self._stats_lock:
+                self._failed_paths.discard(user_path)
+
+    def submit(self, user_path: Path, record: dict):
+        queued = blocked = False
+        start = time.perf_counter()
+        with self._close_lock:
+            closed = self._closed
+            if not closed:
+                try:
+                    self._queue.put_nowait((user_path, record))
+                    queued = True
+                except Full:
+                    blocked = True
+                    try:
+                        self._queue.put((user_path, record), timeout=SUBMIT_TIMEOUT)
+                        queued = True
+                    except Full:
+                        pass
+        if not queued:
+            if not closed:
+                logger.warning("Survey writer queue stayed full, writing on the script thread")
+            append_records(user_path, [record])
+            self._written(user_path, [record])
+            if closed:
+                return
+        with self._stats_lock:
+            if blocked:
+                self.stats.blocked += 1
+                self.stats.blocked_seconds += time.perf_counter() - start
+                if not queued:
+                    self.stats.written_inline += 1
+            self.stats.submitted += 1
+            self.stats.max_queue_depth = max(self.stats.max_queue_depth, self._queue.qsize())
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        # True once everything submitted before the call is on disk, False if records
+        # failed to be written meanwhile or the timeout passed first
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._stats_lock:
+            failed = self.stats.failed
+        done = Event()
+        with self._close_lock:
+            if self._closed:
+                return True
+            try:
+                self._queue.put(done, timeout=timeout)
+            except Full:
+                return False
+        if not done.wait(None if deadline is None else max(0.0, deadline - time.monotonic())):
+            return False
+        with self._stats_lock:
+            return self.stats.failed == failed
+
+    def close(self):
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        stop = False
+        # Records submitted while closing are still written
+        while not (stop and self._queue.empty()):
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except Empty:
+                    break
+            by_path: dict[Path, list[dict]] = defaultdict(list)
+            markers = []
+            for item in batch:
+                if item is None:
+                    stop = True
+                elif isinstance(item, Event):
+                    markers.append(item)
+                else:
+                    by_path[item[0]].append(item[1])
+            for user_path, records in by_path.items():
+                try:
+                    append_records(user_path, records)
+                except OSError:
+                    logger.exception("Could not save %i records to %s", len(records), user_path)
+                    with self._stats_lock:
+                        self.stats.failed += len(records)
+                        self._failed_paths.add(user_path)
+                    continue
+                self._written(user_path, records)
+                with self._stats_lock:
+                    self.stats.written += len(records)
+            with self._stats_lock:
+                self.stats.batches += 1
+            for marker in markers:
+                marker.set()
+
+
+# Newest state of a session and the time it was saved. Sessions saved before the log was
+# introduced have one complete, timestamped JSON file per save instead
+def read_session(user_path: Path) -> Optional[tuple[dict, str]]:
+    state: Optional[dict] = None
+    timestamp = None
+    if (user_path / SESSION_LOG).exists():
+        with open(user_path / SESSION_LOG, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A write interrupted midway, the records before it are intact
+                    continue
+                if record["snapshot"] or state is None:
+                    state = {}
+                apply_delta(state, record["state"])
+                timestamp = record["timestamp"]
+    if state is None:
+        try:
+            newest = next(iter(sorted(user_path.glob("*.json"))[::-1]))
+        except StopIteration:
+            return None
+        state = json.loads(newest.read_text())
+        timestamp = newest.stem
+    return state, timestamp
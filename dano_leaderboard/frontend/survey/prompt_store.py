@@ -0,0 +1,63 @@
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+from ...constants import PROMPTS_PATH
+
+# Decoded answer lines kept in memory, about what a handful of active sessions look at
+ANSWER_CACHE_ENTRIES = 64
+
+
+@dataclass(frozen=True)
+class SurveyPrompt:
+    category: str
+    use_case: str
+    prompt: str
+
+
+@lru_cache(maxsize=ANSWER_CACHE_ENTRIES)
+def _read_answers(path: Path, start: int, end: int) -> dict[str, str]:
+    with open(path, "rb") as file:
+        file.seek(start)
+        return json.loads(file.read(end - start))["models"]
+
+
+# Index of the survey prompts. The model answers are most of the file and are only read,
+# one prompt line at a time, when shown
+@dataclass(frozen=True)
+class PromptStore:
+    path: Path
+    prompts: list[SurveyPrompt]
+    models: list[str]
+    # Byte range of the line of each prompt
+    line_spans: list[tuple[int, int]]
+
+    @classmethod
+    def index(cls, path: Path = PROMPTS_PATH) -> "PromptStore":
+        prompts, line_spans = [], []
+        models: list[str] = []
+        offset = 0
+        with open(path, "rb") as file:
+            for line in file:
+                start, offset = offset, offset + len(line)
+                if not line.strip():
+                    continue
+                example = json.loads(line)
+                if not prompts:
+                    models = list(example["models"].keys())
+                prompts.append(
+                    SurveyPrompt(example["category"], example["use_case"], example["prompt"])
+                )
+                line_spans.append((start, offset))
+        return cls(path, prompts, models, line_spans)
+
+    def __len__(self):
+        return len(self.prompts)
+
+    @property
+    def categories(self) -> list[str]:
+        return sorted(set(prompt.category for prompt in self.prompts))
+
+    def answer(self, idx: int, model: str) -> str:
+        return _read_answers(self.path, *self.line_spans[idx])[model]
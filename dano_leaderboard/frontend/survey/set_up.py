@@ -1,4 +1,3 @@
-from datetime import datetime
 import json
 from pathlib import Path
 from uuid import uuid4
@@ -10,22 +9,25 @@ import streamlit_survey as ss
 
 from .ab_test import build_ab_test
 from .welcome import build_welcome
-from .infrastructure import OUTPUT_DIR, PAIRS_TO_SHOW, logger
+from .infrastructure import OUTPUT_DIR, PAIRS_TO_SHOW, SNAPSHOT_EVERY, logger
+from .persistence import SUBMIT_TIMEOUT, RecordWriter, session_record, state_delta
+from .prompt_store import PromptStore
+from ..layouts import set_global_style
 
 
-def fetch_model_answers_cached():
-    return [
-        json.loads(line)
-        for line in (Path(__file__).parent.parent.parent / "assets" / "prompts.jsonl")
-        .read_text()
-        .split("\n")
-        if line.strip()
-    ]
+@st.cache_resource
+def fetch_prompt_store() -> PromptStore:
+    return PromptStore.index()
 
 
-def set_up_state() -> list[dict]:
-    examples: list[dict] = fetch_model_answers_cached()
-    all_models: list[str] = list(examples[0]["models"].keys())
+@st.cache_resource
+def fetch_record_writer() -> RecordWriter:
+    return RecordWriter()
+
+
+def set_up_state() -> PromptStore:
+    examples = fetch_prompt_store()
+    all_models: list[str] = examples.models
     if "user_id" not in st.session_state:
         st.session_state["user_id"] = str(uuid4())
 
@@ -54,7 +56,7 @@ def set_up_state() -> list[dict]:
             models: False for models in st.session_state["chosen_models"]
         }
     if "category_order" not in st.session_state:
-        categories = sorted(set(example["category"] for example in examples))
+        categories = examples.categories
         shuffle(categories)
         st.session_state["category_order"] = categories
     if "example_order" not in st.session_state:
@@ -66,8 +68,6 @@ def set_up_state() -> list[dict]:
 
 def save_state(survey: ss.StreamlitSurvey):
     user_path: Path = OUTPUT_DIR / st.session_state["user_id"]
-    user_path.mkdir(exist_ok=True)
-
     output_data = {
         "answers": survey.data,
         "user_id": st.session_state["user_id"],
@@ -80,8 +80,23 @@ def save_state(survey: ss.StreamlitSurvey):
         },
     }
 
-    this_path = user_path / (datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
-    this_path.write_text(json.dumps(output_data))
+    # Compared as JSON such that e.g. tuples and lists of the same values are equal
+    output_data = json.loads(json.dumps(output_data))
+    writer = fetch_record_writer()
+    saved_data = st.session_state.get("saved_data")
+    # Lost records are not rewritten by later deltas, so the whole state is saved again
+    if saved_data is None or writer.has_failed(user_path):
+        record = session_record(output_data, snapshot=True)
+        st.session_state["n_saved"] = 0
+    else:
+        delta = state_delta(saved_data, output_data)
+        if not delta:
+            return
+        snapshot = st.session_state["n_saved"] % SNAPSHOT_EVERY == 0
+        record = session_record(output_data if snapshot else delta, snapshot=snapshot)
+    writer.submit(user_path, record)
+    st.session_state["n_saved"] += 1
+    st.session_state["saved_data"] = output_data
 
 
 @st.experimental_dialog("Tak!")
@@ -94,8 +109,23 @@ def goodbye_dialog():
     st.page_link("✨_Hello.py", label="➡️ Projektforside")
 
 
+@st.experimental_dialog("Ups!")
+def not_saved_dialog():
+    st.error(
+        "Din besvarelse kunne desværre ikke gemmes.\n"
+        "Prøv venligst at indsende igen om lidt."
+    )
+
+
 def goodbye(survey: ss.StreamlitSurvey):
     save_state(survey)
+    # The answers must be on disk before thanking for them
+    writer = fetch_record_writer()
+    user_path = OUTPUT_DIR / st.session_state["user_id"]
+    if not writer.flush(timeout=SUBMIT_TIMEOUT) or writer.has_failed(user_path):
+        logger.error("Answers of %s not saved at submit", st.session_state["user_id"])
+        not_saved_dialog()
+        return
     st.balloons()
     goodbye_dialog()
 
@@ -133,3 +163,8 @@ def build_survey_pages():
         else:
             build_ab_test(examples, survey, pages)
         save_state(survey)
+
+
+def build_survey():
+    set_global_style(wide=True, title="Spørgeskema [Da.]", sidebar="collapsed")
+    build_survey_pages()
@@ -1,7 +1,13 @@
 from pandas.io.formats.style import Styler
 
-from ..backend.data import Metric, ResultDump
-from .details import MODEL_DICT, SCENARIOS
+from dataclasses import dataclass
+from math import isnan
+import warnings
+from typing import Optional
+
+from ..backend.data import Metric
+from . import details
+from .result_parsing import DimensionView
 import pandas as pd
 import numpy as np
 import re
@@ -12,19 +18,76 @@ TOP_THREE_EMOJIS = "🥇", "🥈", "🥉"
 CLOSED_EMOJI = "🔒"
 INSTRUCT_EMOJI = "🎯"
 PARAMS_EMOJI = "📏"
+INTERVAL_EMOJI = "🎲"
+RANK_EMOJI = "🏅"
+
+# Metric values sampled per model and scenario for the index intervals by default
+INDEX_SAMPLES = 1000
+# Sampled metric values held in memory at once
+INDEX_SAMPLE_BATCH_ENTRIES = 2**22
+
+
+# Chosen metrics pivoted into models x scenarios matrices in order of first appearance
+@dataclass
+class MetricTable:
+    models: list[str]
+    scenarios: list[str]
+
+    present: np.ndarray
+    # Missing cells are NaN in value and uncertainty, uncertainty is also NaN if not known
+    value: np.ndarray
+    uncertainty: np.ndarray
+    N: np.ndarray
+    higher_is_better: np.ndarray
+
+    def take(self, rows: np.ndarray) -> "MetricTable":
+        return MetricTable(
+            [model for model, keep in zip(self.models, rows) if keep],
+            self.scenarios,
+            self.present[rows],
+            self.value[rows],
+            self.uncertainty[rows],
+            self.N[rows],
+            self.higher_is_better[rows],
+        )
+
+    def frame(self, matrix: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(matrix, index=self.models, columns=self.scenarios)
+
 
+def build_metric_table(
+    view: DimensionView, show_missing=False, chosen_metrics: Optional[dict[tuple, Metric]] = None
+) -> MetricTable:
+    chosen_metrics = chosen_metrics or {}
+    model_idx: dict[str, int] = {}
+    scenario_idx: dict[str, int] = {}
+    rows, cols, metrics = [], [], []
+    for res in view.results:
+        rows.append(model_idx.setdefault(res.model, len(model_idx)))
+        cols.append(scenario_idx.setdefault(res.scenario, len(scenario_idx)))
+        metrics.append(chosen_metrics.get(res.key, res.chosen_metric))
 
-def build_metric_table(dump: ResultDump, show_missing=False) -> pd.DataFrame:
-    df = pd.DataFrame()
-    for res in dump.results:
-        if res.model not in df.index:
-            df.loc[res.model, :] = [None] * len(df.columns)
-        if res.scenario not in df.columns:
-            df[res.scenario] = [None] * len(df)
-        df.at[res.model, res.scenario] = res.chosen_metric
+    def pivot(vals: list, fill, dtype) -> np.ndarray:
+        matrix = np.full((len(model_idx), len(scenario_idx)), fill, dtype=dtype)
+        matrix[rows, cols] = vals
+        return matrix
+
+    table = MetricTable(
+        list(model_idx),
+        list(scenario_idx),
+        present=pivot(True, False, bool),
+        value=pivot([metric.value for metric in metrics], np.nan, float),
+        uncertainty=pivot(
+            [np.nan if metric.uncertainty is None else metric.uncertainty for metric in metrics],
+            np.nan,
+            float,
+        ),
+        N=pivot([metric.N for metric in metrics], 0, int),
+        higher_is_better=pivot([metric.higher_is_better for metric in metrics], False, bool),
+    )
     if not show_missing:
-        df = df.dropna()
-    return df
+        table = table.take(table.present.all(axis=1))
+    return table
 
 
 def _space(val: str, spacing=5) -> str:
@@ -44,78 +107,205 @@ def _format_err(num):
         return str(num)
 
 
-def calc_scenario_scores(col: pd.Series):
-    vals = pd.Series(
-        [metric.value if isinstance(metric, Metric) else float("nan") for metric in col]
-    )
-    return (vals - vals.min()) / (vals.max() - vals.min())
-
-
-def calculate_index(df: pd.DataFrame, micro=True, do_top_three=True):
-    index_scores = df.apply(calc_scenario_scores)
-
-    weights = []
-    for col in df.columns:
-        example_metrics = [metric for metric in df[col] if isinstance(metric, Metric)]
-        if example_metrics and not example_metrics[0].higher_is_better:
-            index_scores[col] = 1 - index_scores[col]
-        weights.append(example_metrics[0].N or 1 if example_metrics else 1)
-    weights = np.array(weights)
-
-    mean_idx = (
-        index_scores.apply(
-            lambda x: np.ma.average(
-                np.ma.MaskedArray(x, mask=np.isnan(x)),
-                weights=weights,
-            ),
-            axis=1,
-        )
-        if micro
-        else index_scores.mean(axis=1)
-    )
+def calc_scenario_scores(
+    values: np.ndarray, reference: Optional[np.ndarray] = None
+) -> np.ndarray:
+    # Min-max normalisation of each scenario column by the range of the reference values,
+    # values themselves by default, NaN stays NaN. Leading dimensions of values are a batch of
+    # independent tables
+    if not values.shape[-2]:
+        return values.astype(float)
+    reference = values if reference is None else reference
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        low = np.nanmin(reference, axis=-2, keepdims=True)
+        high = np.nanmax(reference, axis=-2, keepdims=True)
+        return (values - low) / (high - low)
+
+
+def top_three_rows(index_scores: np.ndarray, present: np.ndarray) -> list[np.ndarray]:
+    # Like Series.nlargest(3): Descending with ties in row order, then rows with NaN scores
+    k = min(len(TOP_THREE_EMOJIS), len(index_scores))
+    if not k:
+        return [np.array([], dtype=int) for _ in range(index_scores.shape[1])]
+    missing = np.isnan(index_scores)
+    filled = np.where(missing, -np.inf, index_scores)
+    candidates = np.argpartition(-filled, k - 1, axis=0)[:k]
+    thresholds = np.take_along_axis(filled, candidates, axis=0).min(axis=0)
+    top_rows = []
+    for j, threshold in enumerate(thresholds):
+        rows = np.flatnonzero((filled[:, j] >= threshold) & ~missing[:, j])
+        rows = rows[np.lexsort((rows, -filled[rows, j]))][:k]
+        if len(rows) < k:
+            rows = np.concatenate((rows, np.flatnonzero(missing[:, j] & present[:, j])))[:k]
+        top_rows.append(rows)
+    return top_rows
+
+
+def scenario_directions(table: MetricTable) -> tuple[np.ndarray, np.ndarray]:
+    # Direction and weight of a scenario are taken from the first model having it
+    if not table.models:
+        return np.zeros(len(table.scenarios), dtype=bool), np.ones(len(table.scenarios))
+    first_rows, any_present = table.present.argmax(axis=0), table.present.any(axis=0)
+    cols = np.arange(len(table.scenarios))
+    lower_is_better = any_present & ~table.higher_is_better[first_rows, cols]
+    weights = np.where(any_present, table.N[first_rows, cols], 1)
+    return lower_is_better, np.where(weights == 0, 1, weights).astype(float)
+
+
+def calc_index_scores(
+    values: np.ndarray, lower_is_better: np.ndarray, reference: Optional[np.ndarray] = None
+) -> np.ndarray:
+    index_scores = calc_scenario_scores(values, reference)
+    index_scores[..., lower_is_better] = 1 - index_scores[..., lower_is_better]
+    return index_scores
+
+
+def micro_average(index_scores: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    # Same operations as np.ma.average over each row with missing values masked
+    missing = np.isnan(index_scores)
+    weight_sums = (weights * ~missing).sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(missing, 0, index_scores * weights).sum(axis=-1) / weight_sums
+
+
+def calculate_index(table: MetricTable, micro=True, do_top_three=True):
+    lower_is_better, weights = scenario_directions(table)
+    index_scores = calc_index_scores(table.value, lower_is_better)
+    if micro:
+        mean = micro_average(index_scores, weights)
+    else:
+        # Kept in pandas for its NaN-skipping summation order, scenarios stored column-wise
+        mean = table.frame(np.asfortranarray(index_scores)).mean(axis=1).to_numpy()
+    mean_idx = pd.Series(mean, index=table.models)
 
-    index_scores.index = df.index
     if do_top_three:
         top_threes = {
-            scenario: index_scores[scenario].nlargest(3).index for scenario in index_scores.columns
+            scenario: [table.models[row] for row in rows]
+            for scenario, rows in zip(table.scenarios, top_three_rows(index_scores, table.present))
         }
         return mean_idx, top_threes
     return mean_idx
 
 
+# Indices of each model for metric values drawn from normal distributions with their
+# uncertainty as standard error, in batches. Values without an uncertainty are kept fixed.
+# Samples are normalised by the range of the point values: The noise widens the range of each
+# sample, which would pull all its scores towards the middle
+def sample_index(table: MetricTable, micro=True, n_samples=INDEX_SAMPLES, seed=0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    lower_is_better, weights = scenario_directions(table)
+    spread = np.nan_to_num(table.uncertainty)
+    batch_size = max(1, INDEX_SAMPLE_BATCH_ENTRIES // max(1, table.value.size))
+    samples = []
+    for start in range(0, n_samples, batch_size):
+        size = min(batch_size, n_samples - start)
+        values = table.value + spread * rng.standard_normal((size, *table.value.shape))
+        index_scores = calc_index_scores(values, lower_is_better, table.value)
+        if micro:
+            samples.append(micro_average(index_scores, weights))
+        else:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                samples.append(np.nanmean(index_scores, axis=-1))
+    return np.concatenate(samples) if samples else np.empty((0, len(table.models)))
+
+
+def index_intervals(
+    table: MetricTable, micro=True, n_samples=INDEX_SAMPLES, alpha=0.05
+) -> pd.DataFrame:
+    if not table.models:
+        return pd.DataFrame(columns=["index_low", "index_high", "rank_low", "rank_high"])
+    samples = sample_index(table, micro, n_samples)
+    # Rank 1 is the highest index, models without an index are ranked last
+    ranks = (-np.nan_to_num(samples, nan=-np.inf)).argsort(axis=1, kind="stable")
+    ranks = ranks.argsort(axis=1, kind="stable") + 1
+    quantiles = [alpha / 2, 1 - alpha / 2]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        index_interval = np.nanquantile(samples, quantiles, axis=0)
+    rank_interval = np.quantile(ranks, quantiles, axis=0, method="nearest")
+    return pd.DataFrame(
+        {
+            "index_low": index_interval[0],
+            "index_high": index_interval[1],
+            "rank_low": rank_interval[0],
+            "rank_high": rank_interval[1],
+        },
+        index=table.models,
+    )
+
+
+def format_interval(low, high) -> str:
+    return _space(str(low)) if low == high else f"{_space(str(low))} - {high}"
+
+
 def format_link(model: str):
     link = "-".join(re.sub(r"\W+", "", part) for part in model.lower().split())
     return "/Models#" + link
 
 
 def add_metadata_columns(df: pd.DataFrame) -> pd.DataFrame:
-    model_details = [MODEL_DICT.get(model, {}) for model in df.index]
-    df[CLOSED_EMOJI] = [details.get("closed", None) for details in model_details]
-    df[INSTRUCT_EMOJI] = [details.get("instruct", None) for details in model_details]
+    model_details = [details.MODEL_DICT.get(model, {}) for model in df.index]
+    df[CLOSED_EMOJI] = [model_detail.get("closed", None) for model_detail in model_details]
+    df[INSTRUCT_EMOJI] = [model_detail.get("instruct", None) for model_detail in model_details]
     df[PARAMS_EMOJI] = [
-        _space(f"{details['params']:.1f}", spacing=4) if "params" in details else ""
-        for details in model_details
+        _space(f"{model_detail['params']:.1f}", spacing=4) if "params" in model_detail else ""
+        for model_detail in model_details
     ]
     return df
 
 
 def style(styler: Styler):
-    styler.background_gradient(vmin=0, vmax=100, subset=[WIN_EMOJI])
+    # Coloured by the numbers in the padded strings, models without an index stay blank
+    index = pd.to_numeric(styler.data[WIN_EMOJI], errors="coerce")
+    styler.background_gradient(vmin=0, vmax=100, subset=[WIN_EMOJI], gmap=index)
     return styler
 
 
-def construct_table(dump: ResultDump, micro=True, show_missing=False):
-    df = build_metric_table(dump, show_missing)
-    mean_idx, top_threes = calculate_index(df, micro=micro)
-    df[WIN_EMOJI] = [_space(str(round(score * 100))) for score in mean_idx]
+def format_metric(value: float, uncertainty: float) -> str:
+    agg = _space(str(round(value * 100)))
+    unc = "± " + _format_err(uncertainty * 100) if uncertainty and not isnan(uncertainty) else ""
+    return agg + unc
+
+
+def format_metric_cells(table: MetricTable) -> pd.DataFrame:
+    cells = [
+        [
+            format_metric(value, uncertainty) if present else None
+            for present, value, uncertainty in zip(*row)
+        ]
+        for row in zip(table.present.tolist(), table.value.tolist(), table.uncertainty.tolist())
+    ]
+    return pd.DataFrame(cells, index=table.models, columns=table.scenarios, dtype=object)
+
+
+def construct_frame(
+    view: DimensionView,
+    micro=True,
+    show_missing=False,
+    chosen_metrics: Optional[dict[tuple, Metric]] = None,
+    n_samples=0,
+) -> pd.DataFrame:
+    table = build_metric_table(view, show_missing, chosen_metrics)
+    mean_idx, top_threes = calculate_index(table, micro=micro)
+    df = format_metric_cells(table)
+    # Models without any value in the selection, shown when missing values are, have no index
+    df[WIN_EMOJI] = [
+        _space(str(round(score * 100)) if not isnan(score) else "") for score in mean_idx
+    ]
+    if n_samples:
+        intervals = index_intervals(table, micro, n_samples)
+        df[INTERVAL_EMOJI] = [
+            format_interval(round(low * 100), round(high * 100)) if not isnan(low) else ""
+            for low, high in zip(intervals["index_low"], intervals["index_high"])
+        ]
+        df[RANK_EMOJI] = [
+            format_interval(low, high)
+            for low, high in zip(intervals["rank_low"], intervals["rank_high"])
+        ]
     df = df.sort_values(WIN_EMOJI, ascending=False)
 
-    for model in df.index:
-        for scenario in df.columns:
-            if isinstance(metric := df[scenario][model], Metric):
-                agg = _space(str(round(metric.value * 100)))
-                unc = "± " + _format_err(metric.uncertainty * 100) if metric.uncertainty else ""
-                df.at[model, scenario] = agg + unc
     for scenario, top_three in top_threes.items():
         for model, emoji in zip(top_three, TOP_THREE_EMOJIS):
             df.at[model, scenario] = df[scenario][model] + emoji
@@ -126,7 +316,22 @@ def construct_table(dump: ResultDump, micro=True, show_missing=False):
             CLOSED_EMOJI,
             PARAMS_EMOJI,
             WIN_EMOJI,
-            *[scenario["scenario"] for scenario in SCENARIOS if scenario["scenario"] in df.columns],
+            *[col for col in (INTERVAL_EMOJI, RANK_EMOJI) if col in df.columns],
+            *[
+                scenario["scenario"]
+                for scenario in details.SCENARIOS
+                if scenario["scenario"] in df.columns
+            ],
         ]
     ]
-    return df.style.pipe(style)
+    return df
+
+
+def construct_table(
+    view: DimensionView,
+    micro=True,
+    show_missing=False,
+    chosen_metrics: Optional[dict[tuple, Metric]] = None,
+    n_samples=0,
+):
+    return construct_frame(view, micro, show_missing, chosen_metrics, n_samples).style.pipe(style)
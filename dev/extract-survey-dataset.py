@@ -1,67 +1,128 @@
 import json
+import os
 from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Optional
+from dano_leaderboard.files import write_text_atomic
 from dano_leaderboard.frontend.survey.infrastructure import OUTPUT_DIR as SURVEY_DATA_DIR
+from dano_leaderboard.frontend.survey.persistence import read_session
 
 OUTPUT_FILE = "survey-data.jsonl"
+MANIFEST_SUFFIX = ".manifest.json"
 ANSWER_FIELDS = "prefer", "likert-A", "likert-B", "text"
 
 
-def main(input_dir: str, output_file: str):
-    print("Extracting survey data from %s to %s" % (input_dir, output_file))
-    data_examples = []
+def session_signature(user_id: Path) -> list[int]:
+    # Any save appends to or adds a file in the session directory
+    mtimes = [entry.stat().st_mtime_ns for entry in os.scandir(user_id) if entry.is_file()]
+    return [max(mtimes, default=0), len(mtimes)]
+
+
+def extract_session(user_id: Path) -> dict:
+    signature = session_signature(user_id)
+    if (session := read_session(user_id)) is None:
+        return {"signature": signature, "session_id": None, "model_pairs": 0, "examples": []}
+    data, timestamp = session
+    common_data = {
+        "user-gender": data["answers"]["Køn"]["value"],
+        "user-age": data["answers"]["Aldersgruppe"]["value"],
+        "user-language": data["answers"]["Modersmål"]["value"],
+        "user-experience": data["answers"]["Erfaring med kunstig intelligens"]["value"],
+        "session-id": data["user_id"],
+        "session-all-chosen-models": data["chosen_models"],
+        "session-all-was-revelead": data["was_revealed"],
+        "session-all-seen-prompts": data["seen_prompts"],
+        "session-timestamp": timestamp,
+    }
 
-    ids, ids_with_content, model_pairs, output_examples = 0, 0, 0, 0
-    for user_id in Path(input_dir).glob("*"):
-        if not user_id.is_dir():
-            continue
-        ids += 1
-        try:
-            newest = next(iter(sorted(user_id.glob("*.json"))[::-1]))
-        except StopIteration:
-            continue
-        data = json.loads(newest.read_text())
-        common_data = {
-            "user-gender": data["answers"]["Køn"]["value"],
-            "user-age": data["answers"]["Aldersgruppe"]["value"],
-            "user-language": data["answers"]["Modersmål"]["value"],
-            "user-experience": data["answers"]["Erfaring med kunstig intelligens"]["value"],
-            "session-id": data["user_id"],
-            "session-all-chosen-models": data["chosen_models"],
-            "session-all-was-revelead": data["was_revealed"],
-            "session-all-seen-prompts": data["seen_prompts"],
-            "session-timestamp": newest.stem,
+    examples = []
+    for i, models in enumerate(data["chosen_models"]):
+        models_key = " ".join(models)
+        models_data = {
+            field: (data["answers"][key]["value"] or "").replace("🤖", "").strip()
+            for field in ANSWER_FIELDS
+            if (key := f"{models_key}-{field}") in data["answers"]
         }
+        if any(models_data.values()):
+            examples.append(
+                {
+                    "model_A": models[0],
+                    "model_B": models[1],
+                    **models_data,
+                    "seen_prompts": data["seen_prompts"][models_key],
+                    "index": i,
+                    "was_revealed": data["was_revealed"][models_key],
+                    **common_data,
+                }
+            )
+    return {
+        "signature": signature,
+        "session_id": data["user_id"],
+        "model_pairs": len(data["chosen_models"]),
+        "examples": examples,
+    }
+
+
+def load_previous(input_dir: str, output_file: str) -> Optional[dict[str, dict]]:
+    # Sessions of the last extraction with their examples read back from its output
+    manifest_path = Path(output_file + MANIFEST_SUFFIX)
+    try:
+        manifest = json.loads(manifest_path.read_text())
+        lines = Path(output_file).read_text().splitlines()
+    except (OSError, ValueError):
+        return None
+    if manifest["input_dir"] != str(Path(input_dir).resolve()):
+        return None
+    examples: dict[str, list[dict]] = {}
+    for line in lines:
+        example = json.loads(line)
+        examples.setdefault(example["session-id"], []).append(example)
+    return {
+        name: {**entry, "examples": examples.get(entry["session_id"], [])}
+        for name, entry in manifest["sessions"].items()
+    }
+
 
-        any_content = False
-        for i, models in enumerate(data["chosen_models"]):
-            model_pairs += 1
-            models_key = " ".join(models)
-            models_data = {
-                field: (data["answers"][key]["value"] or "").replace("🤖", "").strip()
-                for field in ANSWER_FIELDS
-                if (key := f"{models_key}-{field}") in data["answers"]
-            }
-            if any(models_data.values()):
-                output_examples += 1
-                any_content = True
-                data_examples.append(
-                    {
-                        "model_A": models[0],
-                        "model_B": models[1],
-                        **models_data,
-                        "seen_prompts": data["seen_prompts"][models_key],
-                        "index": i,
-                        "was_revealed": data["was_revealed"][models_key],
-                        **common_data,
-                    }
-                )
-        if any_content:
-            ids_with_content += 1
+def main(input_dir: str, output_file: str, incremental=False, workers: Optional[int] = None):
+    print("Extracting survey data from %s to %s" % (input_dir, output_file))
+    user_ids = [user_id for user_id in Path(input_dir).glob("*") if user_id.is_dir()]
+    previous = load_previous(input_dir, output_file) if incremental else None
+    if incremental and previous is None:
+        print("No previous extraction of %s found, extracting all sessions" % input_dir)
+    previous = previous or {}
+
+    def extract_if_changed(user_id: Path) -> dict:
+        entry = previous.get(user_id.name)
+        if entry is not None and entry["signature"] == session_signature(user_id):
+            return entry
+        return extract_session(user_id)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        sessions = dict(
+            zip([user_id.name for user_id in user_ids], executor.map(extract_if_changed, user_ids))
+        )
+    if incremental:
+        n_changed = sum(session is not previous.get(name) for name, session in sessions.items())
+        print("Re-extracted %i new or changed sessions" % n_changed)
+
+    data_examples = [example for session in sessions.values() for example in session["examples"]]
+    ids = len(sessions)
+    ids_with_content = sum(bool(session["examples"]) for session in sessions.values())
+    model_pairs = sum(session["model_pairs"] for session in sessions.values())
+    output_examples = len(data_examples)
     print(
         f"Extracted {output_examples} examples from {model_pairs} model pairs of {ids_with_content} sessions with data from {ids} total sessions"
     )
-    Path(output_file).write_text("".join(json.dumps(ex) + "\n" for ex in data_examples))
+    write_text_atomic(Path(output_file), "".join(json.dumps(ex) + "\n" for ex in data_examples))
+    manifest = {
+        "input_dir": str(Path(input_dir).resolve()),
+        "sessions": {
+            name: {key: val for key, val in session.items() if key != "examples"}
+            for name, session in sessions.items()
+        },
+    }
+    write_text_atomic(Path(output_file + MANIFEST_SUFFIX), json.dumps(manifest))
     print(f"Saved to {output_file}")
 
 
@@ -69,5 +130,16 @@ if __name__ == "__main__":
     parser = ArgumentParser()
     parser.add_argument("--input-dir", type=str, default=SURVEY_DATA_DIR)
     parser.add_argument("--output-file", type=str, default=OUTPUT_FILE)
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only re-extract sessions changed since the last extraction to the output file",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Threads reading session directories, defaults to the executor's default",
+    )
     args = parser.parse_args()
-    main(args.input_dir, args.output_file)
+    main(args.input_dir, args.output_file, incremental=args.incremental, workers=args.workers)
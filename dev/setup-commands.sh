@@ -26,6 +26,12 @@ sudo systemctl enable danoliterate-server
 ## D. Start the server
 # Start the service and check status
 python -m dano_leaderboard.frontend.modify_index_tags
+# Optional: Compile results to the memory-mapped format loaded by the leaderboard
+python -m dano_leaderboard.backend.data dano_leaderboard/assets/result.json dano_leaderboard/assets/result.rdump
+# Optional: Compile the example outputs to per-scenario columnar files
+python -m dano_leaderboard.frontend.example_store
+# Sync the survey answers shown in the articles, the server then refreshes them in the background
+python -m dano_leaderboard.frontend.analysis.survey_snapshot
 sudo systemctl start danoliterate-server
 sudo systemctl status danoliterate-server
 # Reload nginx to apply proxy changes
@@ -1,3 +1,3 @@
-from dano_leaderboard.frontend.layouts import build_leaderboard
+from dano_leaderboard.frontend.leaderboard import build_leaderboard
 
 build_leaderboard()
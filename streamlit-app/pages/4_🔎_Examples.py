@@ -1,3 +1,3 @@
-from dano_leaderboard.frontend.layouts import build_examples
+from dano_leaderboard.frontend.examples import build_examples
 
 build_examples()
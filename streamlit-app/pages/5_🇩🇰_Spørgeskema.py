@@ -1,3 +1,3 @@
-from dano_leaderboard.frontend.layouts import build_survey
+from dano_leaderboard.frontend.survey.set_up import build_survey
 
 build_survey()